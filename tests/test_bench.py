@@ -0,0 +1,22 @@
+from tools.bench import compare
+
+
+def report(results, suites=("templates", "synthetic"), scales=(10,)):
+    return {"meta": {"suites": list(suites), "scales": list(scales)}, "results": results}
+
+
+def test_missing_stage_is_a_regression():
+    baseline = report({"templates/registry/clone": 40.0, "templates/skills/load_cold": 2.0})
+    rows = compare(report({"templates/skills/load_cold": 2.1}), baseline, 0.25)
+    missing = [r for r in rows if r["current_ms"] is None]
+    assert [r["stage"] for r in missing] == ["templates/registry/clone"]
+    assert missing[0]["regression"]
+
+
+def test_stages_outside_the_run_are_not_missing():
+    baseline = report({"templates/skills/load_cold": 2.0, "synthetic/10/resolve_x10": 1.0,
+                       "synthetic/1000/resolve_x10": 5.0})
+    current = report({"synthetic/10/resolve_x10": 1.0}, suites=("synthetic",), scales=(10,))
+    rows = compare(current, baseline, 0.25)
+    assert [r["stage"] for r in rows] == ["synthetic/10/resolve_x10"]
+    assert not any(r["regression"] for r in rows)
@@ -0,0 +1,64 @@
+import subprocess
+
+import pytest
+
+from tools.context_budget import Profiler, Section, hit_rate, section_history
+
+
+def section(heading, tokens, volatility=0.0):
+    return Section(heading, "", tokens, volatility)
+
+
+def test_hit_rate_prefers_volatile_sections_last():
+    stable, volatile = section("A", 900), section("B", 100, 0.5)
+    assert hit_rate([stable, section("C", 100)]) == 1.0
+    assert hit_rate([stable, volatile]) == pytest.approx(0.95)
+    assert hit_rate([volatile, stable]) == pytest.approx(0.5)
+    assert hit_rate([]) == 1.0
+
+
+def write(machines, name, claude):
+    root = machines / name
+    root.mkdir(parents=True)
+    (root / "README.md").write_text(f"# {name}\n")
+    if claude is not None:
+        (root / "CLAUDE.md").write_text(claude)
+
+
+def test_plan_moves_large_sections_and_dedupes_slugs(tmp_path):
+    big = "word " * 400
+    write(tmp_path, "t", f"# T\n\n## Setup!\n{big}\n## Setup?\n{big}\n## Notes\nshort\n")
+    plan = Profiler(tmp_path).plan("t", lazy_over=100)
+    assert [slug for slug, _ in plan["references"]] == ["setup", "setup-2"]
+    assert [s.heading for s in plan["ordered"]] == ["", "Notes", "Reference Material"]
+    pointer = plan["ordered"][-1].text
+    assert "reference/setup-2.md" in pointer
+    assert "tokens" not in pointer
+    assert plan["report"]["tokens_saved"] > 0
+
+
+def test_plan_keeps_repeated_headings(tmp_path):
+    write(tmp_path, "t", "## Notes\nfirst\n\n## Notes\nsecond\n")
+    plan = Profiler(tmp_path).plan("t")
+    assert [s.text.strip() for s in plan["ordered"]] == ["first", "second"]
+
+
+def test_missing_claude_md_is_reported(tmp_path):
+    write(tmp_path, "t", None)
+    report = Profiler(tmp_path).plan("t")["report"]
+    assert report["missing"]
+    assert report["cache_hit_rate"] is None
+
+
+def test_history_tracks_repeated_headings_separately(tmp_path):
+    def git(*args):
+        subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+                       cwd=tmp_path, check=True, capture_output=True)
+
+    path = tmp_path / "CLAUDE.md"
+    git("init", "-q")
+    for second in ("one", "two", "three"):
+        path.write_text(f"# T\n\n## Notes\nsame\n\n## Notes\n{second}\n")
+        git("add", "CLAUDE.md")
+        git("commit", "-q", "-m", second)
+    assert section_history(path) == {("Notes", 1): 1.0}
@@ -0,0 +1,145 @@
+import json
+import subprocess
+import sys
+
+from tools.incidents import TIMELINE_DIR, TimelineStore
+from tools.registry import REPO_ROOT
+
+T0 = 1_700_000_000
+
+
+def event(kind, ts, fp="db-down", **extra):
+    return {"type": kind, "ts": T0 + ts, "service": "api", "fingerprint": fp, "summary": fp, **extra}
+
+
+def pagerduty(kind, ts, key, delivery):
+    return {"event": {
+        "id": delivery,
+        "event_type": f"incident.{kind}",
+        "occurred_at": T0 + ts,
+        "data": {"id": f"P{key}", "type": "incident", "incident_key": key, "title": "disk full",
+                 "service": {"summary": "storage"}},
+    }}
+
+
+def pagerduty_note(ts, key, delivery, content):
+    return {"event": {
+        "id": delivery,
+        "event_type": "incident.annotated",
+        "occurred_at": T0 + ts,
+        "data": {"id": "NOTE1", "type": "incident_note", "content": content,
+                 "incident": {"id": f"P{key}", "type": "incident_reference"}},
+    }}
+
+
+def test_triggers_with_open_group_are_grouped(tmp_path):
+    with TimelineStore(tmp_path) as store:
+        store.ingest([event("trigger", 0), event("trigger", 10), event("trigger", 20, fp="other")])
+        metrics = store.metrics()
+        assert metrics["alerts"] == 3
+        assert metrics["grouped_alerts"] == 1
+        assert metrics["incidents"] == 2
+        record, events = store.incident("INC-00001")
+        assert record["alerts"] == 2
+        assert [e["ts"] for e in events] == [T0, T0 + 10]
+
+
+def test_resolved_group_opens_new_incident(tmp_path):
+    with TimelineStore(tmp_path) as store:
+        store.ingest([event("trigger", 0), event("resolve", 5), event("trigger", 10)])
+        assert store.metrics()["incidents"] == 2
+        assert store.incident("INC-00002")[0]["triggered"] == T0 + 10
+
+
+def test_redelivered_webhooks_are_dropped(tmp_path):
+    with TimelineStore(tmp_path) as store:
+        first = store.ingest([pagerduty("triggered", 0, "k1", "d1")])
+        again = store.ingest([pagerduty("triggered", 0, "k1", "d1"), pagerduty("triggered", 0, "k1", "d1")])
+        assert first["accepted"] == 1
+        assert again == {"accepted": 0, "duplicates": 2, "ignored": 0, "rejected": 0, "errors": []}
+        assert store.metrics()["alerts"] == 1
+
+
+def test_pagerduty_note_joins_its_incident(tmp_path):
+    with TimelineStore(tmp_path) as store:
+        store.ingest([pagerduty("triggered", 0, "k1", "d1"), pagerduty_note(30, "k1", "d2", "rolled back")])
+        _, events = store.incident("INC-00001")
+        assert [e["type"] for e in events] == ["trigger", "note"]
+        assert events[1]["summary"] == "rolled back"
+
+
+def test_same_second_alerts_without_delivery_id_all_count(tmp_path):
+    with TimelineStore(tmp_path) as store:
+        result = store.ingest([event("trigger", 0) for _ in range(3)])
+        assert result["accepted"] == 3
+        assert result["duplicates"] == 0
+        assert store.metrics()["alerts"] == 3
+        assert store.metrics()["grouped_alerts"] == 2
+
+
+def test_mtta_and_mttr(tmp_path):
+    with TimelineStore(tmp_path) as store:
+        store.ingest([
+            event("trigger", 0, fp="a"), event("acknowledge", 60, fp="a"), event("acknowledge", 90, fp="a"),
+            event("resolve", 600, fp="a"),
+            event("trigger", 0, fp="b"), event("acknowledge", 120, fp="b"), event("resolve", 1200, fp="b"),
+        ])
+        metrics = store.metrics()
+        assert metrics["mtta_s"] == 90.0
+        assert metrics["mttr_s"] == 900.0
+        assert metrics["open"] == 0
+
+
+def test_bad_events_are_rejected_without_losing_the_batch(tmp_path):
+    with TimelineStore(tmp_path) as store:
+        result = store.ingest([event("trigger", 0), {"type": "bogus"}, "{not json", ["x"]])
+        assert result["accepted"] == 1
+        assert result["rejected"] == 3
+        assert len(result["errors"]) == 3
+        record, events = store.incident("INC-00001")
+        assert len(events) == 1
+    with TimelineStore(tmp_path) as store:
+        assert store.metrics()["alerts"] == 1
+        assert len(list(store.events())) == 1
+
+
+def test_state_survives_reopen(tmp_path):
+    with TimelineStore(tmp_path, segment_events=2) as store:
+        store.ingest([event("trigger", i, fp=f"f{i}") for i in range(5)])
+    with TimelineStore(tmp_path, segment_events=2) as store:
+        store.ingest([event("trigger", 5, fp="f5")])
+        assert store.metrics()["incidents"] == 6
+        assert len(list(store.events(start=T0 + 2, end=T0 + 4))) == 2
+        assert sorted(p.name for p in (tmp_path / TIMELINE_DIR).glob("segment-*")) == [
+            "segment-000001.jsonl", "segment-000002.jsonl", "segment-000003.jsonl",
+        ]
+
+
+CRASH = """
+import json, os, sys
+from tools.incidents import TimelineStore
+
+store = TimelineStore(sys.argv[1])
+store._commit = lambda: os._exit(3)  # die after the segment append, before the state commit
+store.ingest(json.loads(sys.argv[2]))
+"""
+
+
+def test_crash_between_append_and_commit(tmp_path):
+    with TimelineStore(tmp_path) as store:
+        store.ingest([event("trigger", 0, fp="a")])
+    lost = [event("trigger", 10, fp="b"), event("acknowledge", 20, fp="a")]
+    proc = subprocess.run([sys.executable, "-c", CRASH, str(tmp_path), json.dumps(lost)], cwd=REPO_ROOT)
+    assert proc.returncode == 3
+
+    with TimelineStore(tmp_path) as store:
+        assert store.metrics()["incidents"] == 1
+        assert len(list(store.events())) == 1
+        # The lost batch is not remembered as delivered, so a retry applies it.
+        assert store.ingest(lost)["accepted"] == 2
+        store.ingest([event("trigger", 30, fp="c")])
+        _, b_events = store.incident("INC-00002")
+        _, c_events = store.incident("INC-00003")
+        assert [e["fingerprint"] for e in b_events] == ["b"]
+        assert [e["fingerprint"] for e in c_events] == ["c"]
+        assert store.incident("INC-00001")[0]["acknowledged"] == T0 + 20
@@ -0,0 +1,109 @@
+import json
+import struct
+
+import pytest
+
+from tools import index
+from tools.index import (
+    TABLE_END,
+    TABLE_START,
+    RegistryIndex,
+    RegistryIndexError,
+    build,
+    render_table,
+)
+
+
+def write_template(machines, name, files):
+    for rel, text in files.items():
+        path = machines / name / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def settings(*allow):
+    return json.dumps({"permissions": {"allow": list(allow), "deny": []}})
+
+
+@pytest.fixture
+def machines(tmp_path):
+    root = tmp_path / "machines"
+    write_template(root, "base", {
+        "README.md": "---\ndescription: Shared base\n---\n# Base\n",
+        "CLAUDE.md": "# Base\n",
+        ".claude/settings.json": settings("Bash(ls:*)"),
+        ".mcp.json": json.dumps({"mcpServers": {"memory": {"command": "npx"}}}),
+    })
+    write_template(root, "child", {
+        "README.md": "# Child\n\nInherits from base. More text here.\n",
+        "CLAUDE.md": "---\nbase: base\n---\n## Extra\nx\n",
+    })
+    write_template(root, "solo", {"README.md": "# Solo\n\nStands alone.\n"})
+    return root
+
+
+def test_round_trip(tmp_path, machines):
+    path = tmp_path / "registry.idx"
+    records, rebuilt = build(path, machines)
+    assert rebuilt == ["base", "child", "solo"]
+    with RegistryIndex(path) as idx:
+        assert idx.list_machines() == [
+            {"name": "base", "description": "Shared base"},
+            {"name": "child", "description": "Inherits from base."},
+            {"name": "solo", "description": "Stands alone."},
+        ]
+        assert idx.get("child")["permissions"]["allow"] == ["Bash(ls:*)"]
+        assert idx.templates_using("memory") == ["base", "child"]
+        assert idx.templates_using("nope") == []
+        assert idx.get("missing") is None
+        assert idx.records() == sorted(records, key=lambda r: r["name"])
+
+
+def test_colliding_hashes_are_probed(tmp_path, machines, monkeypatch):
+    monkeypatch.setattr(index, "_key_hash", lambda key: 42)
+    path = tmp_path / "registry.idx"
+    build(path, machines)
+    with RegistryIndex(path) as idx:
+        assert [idx.get(n)["name"] for n in ("base", "child", "solo")] == ["base", "child", "solo"]
+        assert idx.get("other") is None
+
+
+@pytest.mark.parametrize("corrupt, message", [
+    (lambda data: b"XXXX" + data[4:], "not a registry index"),
+    (lambda data: data[:4] + struct.pack("<H", 99) + data[6:], "unsupported index version"),
+    (lambda data: data[:8], "truncated"),
+])
+def test_header_is_checked(tmp_path, machines, corrupt, message):
+    path = tmp_path / "registry.idx"
+    build(path, machines)
+    path.write_bytes(corrupt(path.read_bytes()))
+    with pytest.raises(RegistryIndexError, match=message):
+        RegistryIndex(path)
+
+
+def test_incremental_build_follows_base_edits(tmp_path, machines):
+    path = tmp_path / "registry.idx"
+    build(path, machines)
+    assert build(path, machines)[1] == []
+
+    (machines / "base" / ".claude" / "settings.json").write_text(settings("Bash(ls:*)", "Bash(git:*)"))
+    records, rebuilt = build(path, machines)
+    assert rebuilt == ["base", "child"]
+    with RegistryIndex(path) as idx:
+        assert idx.get("child")["permissions"]["allow"] == ["Bash(ls:*)", "Bash(git:*)"]
+
+
+def test_check_fails_on_stale_table(tmp_path, machines, monkeypatch, capsys):
+    readme = tmp_path / "README.md"
+    readme.write_text(f"# Registry\n\n{TABLE_START}\n| Machine | Description |\n{TABLE_END}\n")
+    monkeypatch.setattr(index, "README_PATH", readme)
+    args = ["--index", str(tmp_path / "registry.idx"), "--machines", str(machines), "build"]
+    assert index.main(args + ["--check"]) == 1
+    assert "out of date" in capsys.readouterr().err
+    assert index.main(args + ["--readme"]) == 0
+    assert index.main(args + ["--check"]) == 0
+
+
+def test_table_escapes_pipes():
+    table = render_table([{"name": "t", "description": "reads | writes"}])
+    assert table.splitlines()[-1] == "| [t](./machines/t) | reads \\| writes |"
@@ -0,0 +1,122 @@
+import json
+
+import pytest
+
+from tools.layers import (
+    LayerError,
+    Resolver,
+    merge_claude_md,
+    merge_json,
+    merge_settings,
+    split_sections,
+)
+
+
+def write_template(machines, name, files):
+    for rel, text in files.items():
+        path = machines / name / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+
+def test_child_section_replaces_and_new_section_appends():
+    base = "# Base\n\n## Setup\nbase setup\n\n## Tools\nbase tools\n"
+    child = "---\nbase: b\n---\n## Setup\nchild setup\n\n## Extra\nextra\n"
+    assert merge_claude_md(base, child) == (
+        "# Base\n\n## Setup\nchild setup\n\n## Tools\nbase tools\n\n## Extra\nextra\n"
+    )
+
+
+def test_plus_heading_appends_to_base_section():
+    base = "## Tools\nbase tools\n"
+    child = "## +Tools\nmore tools\n"
+    assert merge_claude_md(base, child) == "## Tools\nbase tools\n\nmore tools\n"
+
+
+def test_child_preamble_replaces_base_preamble():
+    merged = merge_claude_md("# Base\n\n## A\na\n", "# Child\n\n## B\nb\n")
+    assert merged.startswith("# Child\n")
+    assert "## A\na\n" in merged
+
+
+def test_duplicate_base_headings_keep_all_content():
+    base = "## Example\nfirst example\n\n## Example\nsecond example\n"
+    assert merge_claude_md(base, "") == base
+    merged = merge_claude_md(base, "## Example\nreplaced\n")
+    assert merged == "## Example\nreplaced\n\n## Example\nsecond example\n"
+
+
+def test_headings_inside_fences_do_not_split():
+    body = "## Postmortem\n```markdown\n## Summary\n## Timeline\n```\nafter\n"
+    preamble, sections = split_sections(body)
+    assert preamble == ""
+    assert sections == [("Postmortem", "```markdown\n## Summary\n## Timeline\n```\nafter\n")]
+
+    merged = merge_claude_md(body, "## Summary\nchild summary\n")
+    assert merged == body + "\n## Summary\nchild summary\n"
+
+
+def test_tilde_fence_and_longer_backtick_fence():
+    body = "~~~\n## not a heading\n~~~\n````\n```\n## still code\n````\n## Real\nx\n"
+    _, sections = split_sections(body)
+    assert [h for h, _ in sections] == ["Real"]
+
+
+def test_settings_permission_lists_are_unioned():
+    base = {"permissions": {"allow": ["Bash(git:*)"], "deny": ["Bash(rm:*)"]}, "env": {"A": "1"}}
+    child = {"permissions": {"allow": ["Bash(git:*)", "WebFetch"]}, "env": {"B": "2"}}
+    merged = json.loads(merge_settings(json.dumps(base), json.dumps(child)))
+    assert merged == {
+        "permissions": {"allow": ["Bash(git:*)", "WebFetch"], "deny": ["Bash(rm:*)"]},
+        "env": {"A": "1", "B": "2"},
+    }
+
+
+def test_other_lists_are_replaced():
+    base = {"mcpServers": {"x": {"command": "npx", "args": ["-y", "x"]}}}
+    child = {"mcpServers": {"x": {"args": ["-y", "y"]}}}
+    merged = json.loads(merge_json(json.dumps(base), json.dumps(child)))
+    assert merged == {"mcpServers": {"x": {"command": "npx", "args": ["-y", "y"]}}}
+
+
+def test_null_removes_key():
+    base = {"mcpServers": {"memory": {"command": "npx"}, "fetch": {"command": "uvx"}}}
+    child = {"mcpServers": {"memory": None}}
+    merged = json.loads(merge_json(json.dumps(base), json.dumps(child)))
+    assert merged == {"mcpServers": {"fetch": {"command": "uvx"}}}
+
+
+def test_resolver_merges_chain_and_invalidates_on_base_edit(tmp_path):
+    machines = tmp_path / "machines"
+    write_template(machines, "base", {
+        "CLAUDE.md": "# Base\n\n## Env\nsandbox\n",
+        ".mcp.json": json.dumps({"mcpServers": {"memory": {"command": "npx"}}}),
+        "notes.txt": "base notes",
+    })
+    write_template(machines, "child", {
+        "CLAUDE.md": "---\nbase: base\n---\n## Role\nresponder\n",
+        ".mcp.json": json.dumps({"mcpServers": {"fetch": {"command": "uvx"}}}),
+    })
+    resolver = Resolver(machines, tmp_path / "cache")
+    resolved = resolver.resolve("child")
+    assert resolved.chain == ["base", "child"]
+    assert resolved.files["CLAUDE.md"][1] == b"# Base\n\n## Env\nsandbox\n\n## Role\nresponder\n"
+    assert set(json.loads(resolved.files[".mcp.json"][1])["mcpServers"]) == {"memory", "fetch"}
+    assert resolved.files["notes.txt"][1] == b"base notes"
+
+    key = resolved.key
+    (machines / "base" / "notes.txt").write_text("edited")
+    assert resolver.chain_key("child") != key
+    assert Resolver(machines, tmp_path / "cache").resolve("child").files["notes.txt"][1] == b"edited"
+
+
+def test_resolver_reports_cycles_and_unknown_bases(tmp_path):
+    machines = tmp_path / "machines"
+    write_template(machines, "a", {"CLAUDE.md": "---\nbase: b\n---\n"})
+    write_template(machines, "b", {"CLAUDE.md": "---\nbase: a\n---\n"})
+    write_template(machines, "c", {"CLAUDE.md": "---\nbase: missing\n---\n"})
+    resolver = Resolver(machines, cache_dir=None)
+    with pytest.raises(LayerError, match="cycle"):
+        resolver.chain("a")
+    with pytest.raises(LayerError, match="unknown base"):
+        resolver.chain("c")
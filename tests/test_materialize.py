@@ -0,0 +1,91 @@
+import errno
+import os
+import stat
+
+import pytest
+
+from tools import materialize
+from tools.materialize import Materializer, ObjectStore, provision
+
+
+@pytest.fixture(autouse=True)
+def no_reflink(monkeypatch):
+    """Pin the hardlink/copy paths under test, whatever filesystem tmp is on."""
+
+    def unsupported(src, dest):
+        raise OSError(errno.EOPNOTSUPP, "reflink unsupported")
+
+    monkeypatch.setattr(materialize, "_reflink", unsupported)
+
+
+@pytest.fixture
+def machines(tmp_path):
+    root = tmp_path / "machines" / "t"
+    (root / "bin").mkdir(parents=True)
+    (root / "CLAUDE.md").write_text("# T\n")
+    for i in range(50):
+        script = root / "bin" / f"tool-{i}.sh"
+        script.write_text(f"#!/bin/sh\necho {i}\n")
+        script.chmod(0o755)
+    return tmp_path / "machines"
+
+
+def mode(path):
+    return stat.S_IMODE(path.stat().st_mode)
+
+
+@pytest.mark.parametrize("allow_hardlink", [False, True])
+def test_execute_bits_survive(tmp_path, machines, allow_hardlink):
+    store = ObjectStore(tmp_path / "store")
+    [result] = provision("t", [tmp_path / "ws"], store=store, machines_dir=machines, allow_hardlink=allow_hardlink)
+    assert result.error is None
+    assert mode(tmp_path / "ws" / "bin" / "tool-0.sh") & 0o111 == 0o111
+    assert not mode(tmp_path / "ws" / "CLAUDE.md") & 0o111
+    if allow_hardlink:
+        assert result.strategies.get("hardlink") == result.files
+        # The plain blob stays non-executable; executables link to a variant.
+        sha = store.build_manifest("t", machines).files[0].sha256
+        assert not mode(store.object_path(sha)) & 0o111
+
+
+def test_concurrent_hardlinks_all_succeed(tmp_path, machines):
+    store = ObjectStore(tmp_path / "store")
+    destinations = [tmp_path / f"ws-{i}" for i in range(16)]
+    results = provision("t", destinations, store=store, machines_dir=machines, allow_hardlink=True, workers=16)
+    assert all(r.error is None for r in results)
+    assert sum(r.strategies.get("hardlink", 0) for r in results) == 16 * 51
+    assert not list(store.objects.rglob("*.tmp"))
+
+
+def test_transient_error_does_not_disable_strategy(tmp_path, machines, monkeypatch):
+    store = ObjectStore(tmp_path / "store")
+    manifest = store.build_manifest("t", machines)
+    materializer = Materializer(store, allow_hardlink=True)
+    real_link = os.link
+    calls = []
+
+    def flaky_link(src, dest):
+        calls.append(dest)
+        if len(calls) == 1:
+            raise OSError(errno.ENOENT, "gone")
+        real_link(src, dest)
+
+    monkeypatch.setattr(materialize.os, "link", flaky_link)
+    result = materializer.materialize(manifest, tmp_path / "ws")
+    assert "hardlink" in materializer.strategies
+    assert result.strategies["hardlink"] == result.files - 1
+
+
+def test_unsupported_error_disables_strategy(tmp_path, machines, monkeypatch):
+    store = ObjectStore(tmp_path / "store")
+    manifest = store.build_manifest("t", machines)
+    materializer = Materializer(store, allow_hardlink=True)
+
+    def cross_device(src, dest):
+        raise OSError(errno.EXDEV, "cross-device link")
+
+    monkeypatch.setattr(materialize.os, "link", cross_device)
+    result = materializer.materialize(manifest, tmp_path / "ws")
+    assert result.error is None
+    assert "hardlink" not in materializer.strategies
+    assert "hardlink" not in result.strategies
@@ -0,0 +1,119 @@
+import sys
+import threading
+
+import pytest
+
+from tools.mcp_pool import MCPError, ServerPool, ServerSpec
+from tools.registry import REPO_ROOT
+
+# Answers every request, preceded by a JSON batch line the client must ignore.
+NOISY_SERVER = """
+import json, sys
+for line in sys.stdin:
+    msg = json.loads(line)
+    if "id" in msg:
+        sys.stdout.write("[1, 2]\\n" + json.dumps({"jsonrpc": "2.0", "id": msg["id"], "result": {}}) + "\\n")
+        sys.stdout.flush()
+"""
+
+
+def stub(*args):
+    return ServerSpec("stub", sys.executable, ("-m", "tools.mcp_stub", *args), cwd=str(REPO_ROOT))
+
+
+def test_reuses_server_within_template():
+    pool = ServerPool()
+    try:
+        first = pool.acquire("a", stub())
+        pool.release(first)
+        assert pool.acquire("a", stub()) is first
+        assert pool.metrics.spawns == 1
+    finally:
+        pool.close()
+
+
+def test_concurrent_spawns_respect_max_servers():
+    pool = ServerPool(max_servers=1)
+    acquired, errors = [], []
+
+    def worker(template):
+        try:
+            acquired.append(pool.acquire(template, stub("--startup-delay", "0.3")))
+        except MCPError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in ("a", "b")]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(acquired) == 1
+        assert len(errors) == 1
+        assert sum(s.alive for s in acquired) == 1
+    finally:
+        pool.close()
+
+
+def test_non_object_lines_do_not_stop_reader():
+    pool = ServerPool()
+    try:
+        server = pool.acquire("a", ServerSpec("noisy", sys.executable, ("-c", NOISY_SERVER)))
+        assert server.request("ping", timeout=5) == {}
+        assert server.request("ping", timeout=5) == {}
+    finally:
+        pool.close()
+
+
+def test_dead_server_is_closed_and_replaced():
+    pool = ServerPool()
+    try:
+        dead = pool.acquire("a", stub())
+        pool.release(dead)
+        dead.proc.kill()
+        dead.proc.wait()
+        fresh = pool.acquire("a", stub())
+        assert fresh is not dead
+        assert dead.proc.stdin.closed
+    finally:
+        pool.close()
+
+
+def test_exhausted_pool_raises():
+    pool = ServerPool(max_servers=1)
+    try:
+        pool.acquire("a", stub())
+        with pytest.raises(MCPError, match="exhausted"):
+            pool.acquire("b", stub())
+    finally:
+        pool.close()
+
+
+def test_evicted_server_closes_outside_the_lock(monkeypatch):
+    pool = ServerPool(max_servers=1)
+    try:
+        idle = pool.acquire("a", stub())
+        pool.release(idle)
+        held = []
+        real_close = idle.close
+        monkeypatch.setattr(idle, "close", lambda: (held.append(pool._lock.locked()), real_close()))
+        pool.acquire("b", stub())
+        assert held == [False]
+        assert pool.metrics.evictions == 1
+        assert pool.metrics.spawns == 2
+    finally:
+        pool.close()
+
+
+def test_concurrent_spawn_metrics():
+    pool = ServerPool()
+    threads = [threading.Thread(target=pool.acquire, args=(f"t{i}", stub())) for i in range(8)]
+    try:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert pool.metrics.spawns == pool.metrics.misses == 8
+        assert len(pool.metrics.spawn_latency_ms) == 8
+    finally:
+        pool.close()
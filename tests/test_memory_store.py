@@ -0,0 +1,83 @@
+import io
+import json
+import sqlite3
+
+import pytest
+
+from tools.memory_store import FTS_VERSION, MemoryStore, main, serve
+
+
+@pytest.fixture
+def store():
+    s = MemoryStore(":memory:")
+    s.create_entities([
+        {"name": "Alice", "entityType": "person", "observations": ["Studies reward hacking", "50% done_x"]},
+        {"name": "Bob", "entityType": "Robot", "observations": ["plays chess"]},
+    ])
+    s.create_relations([{"from": "Alice", "to": "Bob", "relationType": "mentors"}])
+    yield s
+    s.close()
+
+
+def names(graph):
+    return sorted(e["name"] for e in graph["entities"])
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("ward", ["Alice"]),          # inside a word
+    ("REWARD HACK", ["Alice"]),   # case-insensitive, spans words
+    ("robot", ["Bob"]),           # entity type
+    ("al", ["Alice"]),            # shorter than a trigram
+    ("50%", ["Alice"]),           # LIKE wildcards are literal
+    ("_x", ["Alice"]),
+    ("zzz", []),
+    ("", ["Alice", "Bob"]),
+])
+def test_search_is_case_insensitive_substring(store, query, expected):
+    assert names(store.search_nodes(query)) == expected
+
+
+def test_search_returns_relations_among_matches(store):
+    graph = store.search_nodes("e")
+    assert graph["relations"] == [{"type": "relation", "from": "Alice", "to": "Bob", "relationType": "mentors"}]
+
+
+def test_neighbours(store):
+    assert names(store.neighbours("Bob")) == ["Alice", "Bob"]
+
+
+def test_old_fts_index_is_rebuilt(tmp_path):
+    path = tmp_path / "memory.db"
+    db = sqlite3.connect(path)
+    db.executescript("""
+        CREATE TABLE entities (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, entity_type TEXT NOT NULL);
+        CREATE VIRTUAL TABLE entities_fts USING fts5(name, entity_type, content='entities', content_rowid='id');
+        INSERT INTO entities VALUES (1, 'interpretability', 'topic');
+    """)
+    db.close()
+    s = MemoryStore(path)
+    try:
+        assert s.db.execute("PRAGMA user_version").fetchone()[0] == FTS_VERSION
+        assert names(s.search_nodes("pretab")) == ["interpretability"]
+    finally:
+        s.close()
+
+
+def test_db_option_after_subcommand(tmp_path, capsys):
+    source = tmp_path / "memory.json"
+    source.write_text(json.dumps({"type": "entity", "name": "A", "entityType": "t", "observations": ["x"]}) + "\n")
+    assert main(["import", str(source), "--db", str(tmp_path / "after.db")]) == 0
+    assert main(["--db", str(tmp_path / "before.db"), "import", str(source)]) == 0
+    capsys.readouterr()
+    assert main(["export", "--db", str(tmp_path / "after.db")]) == 0
+    assert json.loads(capsys.readouterr().out)["name"] == "A"
+
+
+def test_serve_survives_malformed_lines(store):
+    stdin = io.StringIO('not json\n[1, 2]\n{"id": 7, "params": "x"}\n{"jsonrpc": "2.0", "id": 1, "method": "ping"}\n')
+    stdout = io.StringIO()
+    serve(store, stdin, stdout)
+    replies = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert [r.get("error", {}).get("code") for r in replies] == [-32700, -32600, -32600, None]
+    assert replies[2]["id"] == 7
+    assert replies[3] == {"jsonrpc": "2.0", "id": 1, "result": {}}
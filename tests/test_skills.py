@@ -0,0 +1,106 @@
+import os
+import shutil
+import zipfile
+
+import pytest
+
+from tools import skills
+from tools.skills import Catalog, SkillError, pack, scan_archive
+
+
+@pytest.fixture
+def source(tmp_path):
+    root = tmp_path / "src" / "demo"
+    (root / "scripts").mkdir(parents=True)
+    (root / "SKILL.md").write_text("---\nname: demo\ndescription: Does demo things\n---\n# Demo\n\nBody.\n")
+    (root / "scripts" / "run.sh").write_text("#!/bin/sh\necho demo\n")
+    return root
+
+
+def test_pack_is_byte_identical(tmp_path, source):
+    assert pack(source, tmp_path / "a.skill")
+    for path in source.rglob("*"):
+        os.utime(path, (1_000_000_000, 1_000_000_000))
+    (source / "scripts" / "run.sh").chmod(0o755)
+    assert pack(source, tmp_path / "b.skill")
+    assert (tmp_path / "a.skill").read_bytes() == (tmp_path / "b.skill").read_bytes()
+
+
+def test_pack_skips_unchanged_sources(tmp_path, source):
+    archive = tmp_path / "demo.skill"
+    assert pack(source, archive)
+    before = archive.stat().st_mtime_ns
+    assert not pack(source, archive)
+    assert archive.stat().st_mtime_ns == before
+    (source / "scripts" / "run.sh").write_text("#!/bin/sh\necho changed\n")
+    assert pack(source, archive)
+    assert pack(source, archive, force=True)
+
+
+@pytest.fixture
+def archive(tmp_path, source):
+    path = tmp_path / "demo.skill"
+    pack(source, path)
+    return path
+
+
+@pytest.fixture
+def counted(archive, monkeypatch):
+    calls = {"hash": 0, "scan": 0}
+    real_hash, real_scan = skills.hash_file, skills.scan_archive
+
+    def hash_file(path):
+        calls["hash"] += 1
+        return real_hash(path)
+
+    def scan(path, sha256=None):
+        calls["scan"] += 1
+        return real_scan(path, sha256)
+
+    monkeypatch.setattr(skills, "hash_file", hash_file)
+    monkeypatch.setattr(skills, "scan_archive", scan)
+    return calls
+
+
+def test_catalog_reuses_entries_by_signature(tmp_path, archive, counted):
+    cache = tmp_path / "skills.json"
+    first = Catalog(cache)
+    assert first.load([archive])["demo"].description == "Does demo things"
+    first.save()
+    assert counted == {"hash": 1, "scan": 1}
+
+    assert Catalog(cache).load([archive])["demo"].description == "Does demo things"
+    assert counted == {"hash": 1, "scan": 1}
+
+
+def test_catalog_reuses_entries_by_hash(tmp_path, archive, counted):
+    catalog = Catalog(cache_path=None)
+    catalog.load([archive])
+    copy = tmp_path / "copy.skill"
+    shutil.copyfile(archive, copy)
+    loaded = catalog.load([copy])
+    assert counted == {"hash": 2, "scan": 1}
+    assert loaded["demo"].archive == os.fspath(copy)
+
+
+def test_scan_reads_only_frontmatter(tmp_path, monkeypatch):
+    archive = tmp_path / "big.skill"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("big/SKILL.md", "---\nname: big\ndescription: Large body\n---\n" + "x" * 1_000_000)
+    read = []
+    real_read = zipfile.ZipExtFile.read
+    monkeypatch.setattr(zipfile.ZipExtFile, "read", lambda self, n=-1: read.append(n) or real_read(self, n))
+
+    [skill] = scan_archive(archive)
+    assert (skill.name, skill.description) == ("big", "Large body")
+    assert all(0 < n <= 1024 for n in read)
+    assert len(read) == 1
+    assert skill.body().startswith("xxx")
+
+
+def test_archive_without_skill_md(tmp_path):
+    archive = tmp_path / "empty.skill"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("empty/README.md", "# nothing\n")
+    with pytest.raises(SkillError, match="no SKILL.md"):
+        scan_archive(archive)
@@ -0,0 +1,61 @@
+import asyncio
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from tools import stress
+from tools.stress import DEFAULT_LIMITS, ResponseCache, Runner, StressError, Suite
+
+
+def write_suite(tmp_path, **overrides):
+    data = {"prompts": {"p": "You classify."}, "cases": [{"id": "a", "input": "hi"}], "models": ["mock:m"]}
+    data.update(overrides)
+    path = tmp_path / "suite.json"
+    path.write_text(json.dumps(data))
+    return path
+
+
+def test_case_without_input_is_rejected(tmp_path):
+    with pytest.raises(StressError, match="input"):
+        Suite.load(write_suite(tmp_path, cases=[{"id": "missing"}]))
+
+
+def test_limit_override_keeps_default_rate():
+    runner = Runner(ResponseCache(":memory:"), limits={"mock": {"concurrency": 2}})
+    assert runner._limits["mock"] == {**DEFAULT_LIMITS["mock"], "concurrency": 2}
+
+
+@pytest.fixture
+def garbage_server(monkeypatch):
+    """An OpenAI-style endpoint that answers 200 with a non-JSON body or an unexpected shape."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):  # noqa: N802
+            body = json.loads(self.rfile.read(int(self.headers["content-length"])))
+            data = b"<html>oops</html>" if "html" in body["messages"][-1]["content"] else b'{"choices": []}'
+            self.send_response(200)
+            self.send_header("content-length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(stress.MockProvider, "base_url", f"http://127.0.0.1:{server.server_port}/v1")
+    yield
+    server.shutdown()
+
+
+def test_bad_responses_become_cell_errors(tmp_path, garbage_server):
+    suite = Suite.load(write_suite(tmp_path, cases=[{"id": "html", "input": "html"}, {"id": "shape", "input": "x"}]))
+    out = io.StringIO()
+    summary = asyncio.run(Runner(ResponseCache(":memory:"), max_retries=0).run(suite, out))
+    results = {r["case"]: r for r in map(json.loads, out.getvalue().splitlines())}
+    assert summary.failed == 2
+    assert "invalid JSON" in results["html"]["error"]
+    assert "unexpected response" in results["shape"]["error"]
@@ -0,0 +1,6 @@
+"""Tooling for building, indexing and provisioning machine templates.
+
+Everything here uses only the Python standard library so it can run on a
+fresh clone of the registry. Run modules from the repository root, e.g.
+``python -m tools.materialize --help``.
+"""
@@ -0,0 +1,294 @@
+"""Provisioning benchmarks for the registry.
+
+Two suites, both timing the same code paths machines are provisioned with:
+
+``templates``
+    For every template under ``machines/``: clone of the registry, base
+    chain resolution, manifest build (cold and warm object store),
+    materialization into a fresh workspace, settings/MCP config parsing,
+    and skill catalog loading from ``*.skill`` archives (cold and cached).
+``synthetic``
+    Generated registries of N templates (half of them inheriting from a
+    shared base): cold and incremental index builds, index lookups, and
+    resolving/provisioning a sample of templates.
+
+Each stage reports the median of ``--repeat`` runs in milliseconds, keyed as
+``<suite>/<subject>/<stage>``, together with the :mod:`tools.timing` spans
+recorded along the way. Results are written as JSON (by default to
+``bench_output.txt``) and can be saved as, or compared against, a baseline;
+comparison exits non-zero when a stage is slower than the baseline by more
+than ``--threshold``, or when a baseline stage that this run covers is
+missing from it.
+
+Usage::
+
+    python -m tools.bench --save-baseline bench-baseline.json
+    python -m tools.bench --baseline bench-baseline.json --scales 10 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from tools import timing
+from tools.index import RegistryIndex, build as build_index
+from tools.layers import Resolver
+from tools.materialize import Materializer, ObjectStore, provision
+from tools.registry import MACHINES_DIR, REPO_ROOT, template_names
+from tools.skills import Catalog, find_archives
+
+DEFAULT_OUT = REPO_ROOT / "bench_output.txt"
+DEFAULT_SCALES = (10, 1_000, 10_000)
+# Differences below this many milliseconds are treated as noise.
+NOISE_FLOOR_MS = 0.5
+
+
+def _median(fn, repeat: int, setup=None) -> float:
+    """Median wall time of ``fn(state)`` in ms; ``setup()`` runs untimed before each call."""
+    samples = []
+    for _ in range(repeat):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        fn(state)
+        samples.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def bench_templates(work: Path, repeat: int, machines_dir: Path = MACHINES_DIR) -> dict[str, float]:
+    results: dict[str, float] = {}
+    counter = iter(range(1 << 30))
+
+    def fresh(prefix: str) -> Path:
+        return work / f"{prefix}-{next(counter)}"
+
+    def clone(dest):
+        subprocess.run(
+            ["git", "clone", "--quiet", "--depth", "1", f"file://{REPO_ROOT}", str(dest)],
+            check=True, capture_output=True,
+        )
+
+    try:
+        results["templates/registry/clone"] = _median(clone, repeat, lambda: fresh("clone"))
+    except (OSError, subprocess.CalledProcessError) as exc:
+        # Not a git checkout, or git unavailable. The stage is left out, and a
+        # baseline comparison reports it as missing.
+        print(f"skipping clone stage: {exc}", file=sys.stderr)
+
+    archives = find_archives()
+    results["templates/skills/load_cold"] = _median(lambda _: Catalog(cache_path=None).load(archives), repeat)
+    warm = Catalog(cache_path=work / "skills.json")
+    warm.load(archives)
+    warm.save()
+    results["templates/skills/load_cached"] = _median(
+        lambda _: Catalog(cache_path=work / "skills.json").load(archives), repeat
+    )
+
+    for name in template_names(machines_dir):
+        key = f"templates/{name}"
+        results[f"{key}/resolve"] = _median(
+            lambda _: Resolver(machines_dir, cache_dir=None).resolve(name), repeat
+        )
+        results[f"{key}/manifest_cold"] = _median(
+            lambda store: store.build_manifest(name, machines_dir), repeat, lambda: ObjectStore(fresh("store"))
+        )
+        store = ObjectStore(work / "store-warm")
+        manifest = store.build_manifest(name, machines_dir)
+        results[f"{key}/manifest_warm"] = _median(lambda _: store.build_manifest(name, machines_dir), repeat)
+        materializer = Materializer(store)
+        results[f"{key}/materialize"] = _median(
+            lambda dest: materializer.materialize(manifest, dest), repeat, lambda: fresh("ws")
+        )
+        workspace = fresh("ws")
+        materializer.materialize(manifest, workspace)
+
+        def parse(_):
+            for rel in (".claude/settings.json", ".mcp.json"):
+                path = workspace / rel
+                if path.exists():
+                    json.loads(path.read_bytes())
+
+        results[f"{key}/parse_config"] = _median(parse, repeat)
+    return results
+
+
+_BASE_CLAUDE = "# Base Machine\n\nYou are a helpful agent.\n\n" + "".join(
+    f"## Section {i}\n\n" + "Guidance about the sandbox environment. " * 40 + "\n\n" for i in range(8)
+)
+
+
+def make_registry(root: Path, n: int, seed: int = 0) -> Path:
+    """Write a synthetic registry of ``n`` templates under ``root`` and return its machines dir."""
+    rng = random.Random(seed)
+    machines = root / "machines"
+    for i in range(n):
+        t = machines / f"machine-{i:05d}"
+        (t / ".claude").mkdir(parents=True)
+        if i and i % 2 == 0:
+            claude = f"---\nbase: machine-00000\n---\n## Domain {i}\n\n" + "Specialized knowledge. " * rng.randint(20, 200)
+        else:
+            claude = _BASE_CLAUDE
+        (t / "CLAUDE.md").write_text(claude)
+        (t / "README.md").write_text(f"# Machine {i}\n\nSynthetic template number {i}.\n")
+        (t / ".claude" / "settings.json").write_text(json.dumps({"permissions": {"allow": [f"Bash(tool-{i}:*)"], "deny": []}}))
+        servers = {f"server-{i % 7}": {"command": "npx", "args": ["-y", f"server-{i % 7}"]}} if i % 3 == 0 else {}
+        (t / ".mcp.json").write_text(json.dumps({"mcpServers": servers}))
+    return machines
+
+
+def bench_synthetic(work: Path, n: int, repeat: int, sample: int = 10) -> dict[str, float]:
+    results: dict[str, float] = {}
+    key = f"synthetic/{n}"
+    machines = make_registry(work / f"registry-{n}", n)
+    names = template_names(machines)
+    rng = random.Random(n)
+    picks = [rng.choice(names) for _ in range(sample)]
+    counter = iter(range(1 << 30))
+
+    results[f"{key}/index_build_cold"] = _median(
+        lambda path: build_index(path, machines), repeat, lambda: work / f"index-{n}-{next(counter)}.idx"
+    )
+    index_path = work / f"index-{n}.idx"
+    build_index(index_path, machines)
+    results[f"{key}/index_build_incremental"] = _median(lambda _: build_index(index_path, machines), repeat)
+
+    with RegistryIndex(index_path) as index:
+        lookups = [rng.choice(names) for _ in range(1000)]
+
+        def lookup(_):
+            for name in lookups:
+                index.get(name)
+            index.templates_using("server-0")
+
+        results[f"{key}/index_lookup_x1000"] = _median(lookup, repeat)
+
+    results[f"{key}/resolve_x{sample}"] = _median(
+        lambda _: [Resolver(machines, cache_dir=None).resolve(p) for p in picks], repeat
+    )
+    results[f"{key}/provision_x{sample}"] = _median(
+        lambda store: [provision(p, [work / f"ws-{n}-{next(counter)}"], store=store, machines_dir=machines)
+                       for p in picks],
+        repeat,
+        lambda: ObjectStore(work / f"store-{n}-{next(counter)}"),
+    )
+    shutil.rmtree(work / f"registry-{n}", ignore_errors=True)
+    return results
+
+
+def run(scales=DEFAULT_SCALES, repeat: int = 3, suites=("templates", "synthetic")) -> dict:
+    recorder = timing.Recorder()
+    results: dict[str, float] = {}
+    with tempfile.TemporaryDirectory(prefix="lg-bench-") as tmp, recorder:
+        work = Path(tmp)
+        if "templates" in suites:
+            results.update(bench_templates(work, repeat))
+        if "synthetic" in suites:
+            for n in scales:
+                results.update(bench_synthetic(work, n, repeat))
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                             capture_output=True, text=True).stdout.strip()
+    except OSError:
+        rev = ""
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "revision": rev,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "suites": list(suites),
+            "scales": list(scales) if "synthetic" in suites else [],
+        },
+        "results": results,
+        "spans": recorder.summary(),
+    }
+
+
+def _covered(key: str, meta: dict) -> bool:
+    """Whether a run with ``meta`` was asked to produce stage ``key``."""
+    suite, _, rest = key.partition("/")
+    if suite not in meta.get("suites", ("templates", "synthetic")):
+        return False
+    if suite == "synthetic" and "scales" in meta:
+        return int(rest.partition("/")[0]) in meta["scales"]
+    return True
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[dict]:
+    """Return one row per baseline stage, flagging regressions.
+
+    A stage in the baseline that the current run should have produced but
+    did not (it crashed or was skipped) counts as a regression.
+    """
+    rows = []
+    for key, base in baseline.get("results", {}).items():
+        value = current["results"].get(key)
+        if value is None:
+            if _covered(key, current.get("meta", {})):
+                rows.append({"stage": key, "baseline_ms": base, "current_ms": None, "ratio": None,
+                             "regression": True})
+            continue
+        ratio = value / base if base else float("inf")
+        rows.append({
+            "stage": key,
+            "baseline_ms": base,
+            "current_ms": value,
+            "ratio": round(ratio, 3),
+            "regression": ratio > 1 + threshold and value - base > NOISE_FLOOR_MS,
+        })
+    return rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tools.bench", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--suite", choices=("templates", "synthetic"), action="append",
+                        help="run only this suite (repeatable)")
+    parser.add_argument("--scales", type=int, nargs="+", default=list(DEFAULT_SCALES),
+                        help="synthetic registry sizes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT, help="results file (JSON)")
+    parser.add_argument("--baseline", type=Path, help="compare against this results file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown before failing")
+    parser.add_argument("--save-baseline", type=Path, help="also write results here")
+    args = parser.parse_args(argv)
+
+    report = run(args.scales, args.repeat, tuple(args.suite or ("templates", "synthetic")))
+    text = json.dumps(report, indent=2) + "\n"
+    args.out.write_text(text)
+    if args.save_baseline:
+        args.save_baseline.write_text(text)
+    for key, ms in report["results"].items():
+        print(f"{ms:>12.3f} ms  {key}")
+
+    if not args.baseline:
+        return 0
+    try:
+        baseline = json.loads(args.baseline.read_text())
+    except (OSError, ValueError) as exc:
+        print(f"cannot read baseline {args.baseline}: {exc}", file=sys.stderr)
+        return 1
+    rows = compare(report, baseline, args.threshold)
+    regressions = [r for r in rows if r["regression"]]
+    for r in regressions:
+        if r["current_ms"] is None:
+            print(f"MISSING {r['stage']}: in baseline ({r['baseline_ms']} ms) but not produced by this run",
+                  file=sys.stderr)
+        else:
+            print(f"REGRESSION {r['stage']}: {r['baseline_ms']} -> {r['current_ms']} ms (x{r['ratio']})",
+                  file=sys.stderr)
+    print(f"{len(rows)} stages compared, {len(regressions)} regressions", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+"""Context-budget profiler and prefix-cache-friendly ``CLAUDE.md`` builds.
+
+A template's ``CLAUDE.md`` opens every session, so its size sets first-turn
+cost and its ordering decides how much of it a prompt cache can reuse: a
+cached prefix is only valid up to the first byte that changed.
+
+For each template this tool
+
+* counts tokens per ``## `` section with an offline approximation (word and
+  punctuation pieces, long words split every four characters), which tracks
+  BPE tokenizers closely enough for budgeting;
+* measures how often each section changes, from the git history of every
+  ``CLAUDE.md`` in the template's base chain;
+* emits a build with the preamble and stable sections first and the
+  volatile ones last, optionally moving large reference sections into
+  ``reference/<slug>.md`` files that the agent reads on demand;
+* reports tokens saved and the estimated cache hit rate before and after.
+
+The hit rate assumes each section changes independently with its observed
+per-revision probability ``p``; a token stays cached only if nothing before
+it changed, so the expected cached fraction is
+``sum(tokens_i * prod(1 - p_j for j <= i)) / total``.
+
+Usage::
+
+    python -m tools.context_budget report
+    python -m tools.context_budget build incident-commander --lazy-over 800
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import re
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+from tools.layers import Resolver, split_frontmatter, split_sections
+from tools.registry import MACHINES_DIR, REPO_ROOT, template_names
+
+DEFAULT_OUT = REPO_ROOT / ".cache" / "context"
+REFERENCE_DIR = "reference"
+VOLATILE_THRESHOLD = 0.2
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+def count_tokens(text: str) -> int:
+    """Approximate the BPE token count of ``text`` without a tokenizer."""
+    return sum(math.ceil(len(piece) / 4) if piece[0].isalnum() else 1 for piece in _PIECE_RE.findall(text))
+
+
+@dataclass(eq=False)
+class Section:
+    heading: str  # "" for the preamble
+    text: str
+    tokens: int
+    volatility: float = 0.0
+
+    @property
+    def slug(self) -> str:
+        return re.sub(r"[^a-z0-9]+", "-", self.heading.lower()).strip("-") or "section"
+
+    def render(self) -> str:
+        if not self.heading:
+            return self.text
+        return f"## {self.heading}\n{self.text}"
+
+
+def _keyed(preamble: str, sections: list[tuple[str, str]]) -> dict[tuple[str, int], str]:
+    """Key sections by ``(heading, occurrence)`` so repeated headings stay distinct."""
+    keyed = {("", 0): preamble}
+    for heading, text in sections:
+        n = 0
+        while (heading, n) in keyed:
+            n += 1
+        keyed[heading, n] = text
+    return keyed
+
+
+def section_history(path: Path) -> dict[tuple[str, int], float]:
+    """Return ``{(heading, occurrence): changes / revisions}`` from the git log of ``path``."""
+    try:
+        revs = subprocess.run(
+            ["git", "log", "--format=%H", "--", path.name],
+            cwd=path.parent, capture_output=True, text=True, check=True,
+        ).stdout.split()
+    except (OSError, subprocess.CalledProcessError):
+        return {}
+    if len(revs) < 2:
+        return {}
+    rel = subprocess.run(
+        ["git", "ls-files", "--full-name", path.name], cwd=path.parent, capture_output=True, text=True,
+    ).stdout.strip() or path.name
+
+    changes: dict[tuple[str, int], int] = {}
+    previous: dict[tuple[str, int], str] | None = None
+    for rev in reversed(revs):
+        shown = subprocess.run(["git", "show", f"{rev}:{rel}"], cwd=path.parent, capture_output=True, text=True)
+        if shown.returncode:
+            previous = None
+            continue
+        preamble, sections = split_sections(split_frontmatter(shown.stdout)[1])
+        current = _keyed(preamble, sections)
+        if previous is not None:
+            for key in current.keys() | previous.keys():
+                if current.get(key) != previous.get(key):
+                    changes[key] = changes.get(key, 0) + 1
+        previous = current
+    transitions = len(revs) - 1
+    return {key: n / transitions for key, n in changes.items()}
+
+
+def hit_rate(sections: list[Section]) -> float:
+    """Expected fraction of tokens served from a prefix cache."""
+    total = sum(s.tokens for s in sections)
+    if not total:
+        return 1.0
+    survive, cached = 1.0, 0.0
+    for s in sections:
+        survive *= 1 - s.volatility
+        cached += s.tokens * survive
+    return cached / total
+
+
+class Profiler:
+    def __init__(self, machines_dir: Path = MACHINES_DIR):
+        self.machines_dir = Path(machines_dir)
+        self.resolver = Resolver(machines_dir, cache_dir=None)
+
+    def sections(self, template: str) -> list[Section]:
+        files = self.resolver.resolve(template).files
+        if "CLAUDE.md" not in files:
+            return []
+        preamble, body = split_sections(files["CLAUDE.md"][1].decode("utf-8"))
+        history: dict[tuple[str, int], float] = {}
+        for layer in self.resolver.chain(template):
+            path = self.machines_dir / layer / "CLAUDE.md"
+            if path.exists():
+                for (heading, n), p in section_history(path).items():
+                    key = (heading.lstrip("+").strip(), n)
+                    history[key] = max(p, history.get(key, 0.0))
+        out = [Section("", preamble, count_tokens(preamble), history.get(("", 0), 0.0))] if preamble.strip() else []
+        for (h, n), t in list(_keyed(preamble, body).items())[1:]:
+            out.append(Section(h, t, count_tokens(f"## {h}\n{t}"), history.get((h, n), 0.0)))
+        return out
+
+    def plan(self, template: str, lazy_over: int | None = None, lazy: tuple[str, ...] = (),
+             threshold: float = VOLATILE_THRESHOLD) -> dict:
+        """Return the reordered layout for ``template`` and its report."""
+        sections = self.sections(template)
+        missing = "CLAUDE.md" not in self.resolver.resolve(template).files
+        preamble = [s for s in sections if not s.heading]
+        body = [s for s in sections if s.heading]
+        moved = [
+            s for s in body
+            if s.heading in lazy or (lazy_over is not None and s.tokens > lazy_over and s.volatility < threshold)
+        ]
+        kept = [s for s in body if s not in moved]
+        stable = [s for s in kept if s.volatility < threshold]
+        volatile = sorted((s for s in kept if s.volatility >= threshold), key=lambda s: s.volatility)
+
+        # Headings can differ only in punctuation ("Setup!" / "Setup?"), so
+        # reference file names are de-duplicated.
+        references: list[tuple[str, Section]] = []
+        used: set[str] = set()
+        for s in moved:
+            slug, n = s.slug, 2
+            while slug in used:
+                slug, n = f"{s.slug}-{n}", n + 1
+            used.add(slug)
+            references.append((slug, s))
+
+        # The pointer sits in the cached prefix, so it lists only names: a
+        # token count would change it whenever a moved section is edited.
+        pointers = []
+        if moved:
+            listing = "\n".join(f"- `{REFERENCE_DIR}/{slug}.md`: {s.heading}" for slug, s in references)
+            text = f"\nRead these files when the task needs them:\n\n{listing}\n\n"
+            pointers = [Section("Reference Material", text, count_tokens("## Reference Material\n" + text))]
+        ordered = preamble + stable + pointers + volatile
+
+        before, after = sum(s.tokens for s in sections), sum(s.tokens for s in ordered)
+        report = {
+            "template": template,
+            "missing": missing,
+            "tokens": before,
+            "tokens_after": after,
+            "tokens_saved": before - after,
+            "cache_hit_rate": None if missing else round(hit_rate(sections), 3),
+            "cache_hit_rate_after": None if missing else round(hit_rate(ordered), 3),
+            "sections": [
+                {"heading": s.heading or "(preamble)", "tokens": s.tokens, "volatility": round(s.volatility, 3),
+                 "placement": "lazy" if s in moved else "volatile" if s in volatile else "prefix"}
+                for s in sections
+            ],
+        }
+        return {"ordered": ordered, "moved": moved, "references": references, "report": report}
+
+    def build(self, template: str, out_dir: Path, **kwargs) -> dict:
+        """Write the reordered ``CLAUDE.md`` and reference files under ``out_dir/<template>``."""
+        plan = self.plan(template, **kwargs)
+        if plan["report"]["missing"]:
+            return plan["report"]
+        root = Path(out_dir) / template
+        root.mkdir(parents=True, exist_ok=True)
+        text = ""
+        for s in plan["ordered"]:
+            if text and not text.endswith("\n\n"):
+                text = text.rstrip("\n") + "\n\n"
+            text += s.render()
+        (root / "CLAUDE.md").write_text(text, encoding="utf-8")
+        for slug, s in plan["references"]:
+            path = root / REFERENCE_DIR / f"{slug}.md"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"# {s.heading}\n{s.text}", encoding="utf-8")
+        return plan["report"]
+
+
+def _print_report(report: dict) -> None:
+    if report["missing"]:
+        print(f"{report['template']}: no CLAUDE.md")
+        return
+    print(f"{report['template']}: {report['tokens']} tokens -> {report['tokens_after']} "
+          f"(saved {report['tokens_saved']}), cache hit rate "
+          f"{report['cache_hit_rate']:.0%} -> {report['cache_hit_rate_after']:.0%}")
+    for s in report["sections"]:
+        print(f"  {s['tokens']:>6}  p={s['volatility']:<5}  {s['placement']:<8}  {s['heading']}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tools.context_budget", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--machines", type=Path, default=MACHINES_DIR, help="templates directory")
+    parser.add_argument("--json", action="store_true", help="machine-readable output")
+    parser.add_argument("--lazy-over", type=int, help="move stable sections over N tokens to reference files")
+    parser.add_argument("--lazy", action="append", default=[], metavar="HEADING", help="always move this section")
+    parser.add_argument("--volatile", type=float, default=VOLATILE_THRESHOLD,
+                        help="change rate at which a section is treated as volatile")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("report", help="profile templates").add_argument("templates", nargs="*")
+    p_build = sub.add_parser("build", help="write cache-friendly builds")
+    p_build.add_argument("templates", nargs="*")
+    p_build.add_argument("--out", type=Path, default=DEFAULT_OUT)
+    args = parser.parse_args(argv)
+
+    profiler = Profiler(args.machines)
+    options = {"lazy_over": args.lazy_over, "lazy": tuple(args.lazy), "threshold": args.volatile}
+    reports = []
+    for template in args.templates or template_names(args.machines):
+        if args.command == "build":
+            reports.append(profiler.build(template, args.out, **options))
+        else:
+            reports.append(profiler.plan(template, **options)["report"])
+    for report in reports:
+        if args.json:
+            print(json.dumps(report))
+        else:
+            _print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
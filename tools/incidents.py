@@ -0,0 +1,613 @@
+"""Append-only incident timeline store for the incident-commander machine.
+
+Events (alerts, acknowledgements, resolutions, notes) are ingested in
+batches into numbered JSONL segments under ``<workspace>/incidents/.timeline``.
+Each batch is a single append plus one ``fsync``; a segment is sealed once
+it holds ``segment_events`` events.
+
+Alongside the segments the store keeps a SQLite database, ``state.db``,
+updated with one transaction per batch so that work per batch depends on
+the batch, not on the history:
+
+* a per-segment index of time range, event count, committed byte length
+  and services, so range and service queries open only the segments that
+  can match;
+* incident records and open alert groups keyed by fingerprint. A trigger
+  for a fingerprint that already has an open group is counted as a
+  duplicate alert on it instead of opening a new incident;
+* a window of recent delivery keys, so exact re-deliveries of the same
+  webhook are dropped;
+* a one-row checkpoint of running MTTA/MTTR sums and counters, plus alert
+  volume per service and hour, updated as events arrive rather than by
+  rescanning the logs.
+
+Segment data is fsync'd before the batch's transaction commits, and on open
+any segment bytes past the committed length are cut, so a crash never
+leaves events in the log that the state does not account for.
+
+The human-readable ``incidents/<id>.md`` timeline and ``postmortems/<id>.md``
+draft are rendered on demand from the segments.
+
+Webhooks are normalized from PagerDuty (v3 ``event`` envelopes) and OpsGenie
+(``action``/``alert`` payloads); a replay file of one payload per line stands
+in for the live integrations::
+
+    python -m tools.incidents --workspace ws ingest alerts.jsonl
+    python -m tools.incidents --workspace ws metrics
+    python -m tools.incidents --workspace ws render <incident-id> --postmortem
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+TIMELINE_DIR = Path("incidents") / ".timeline"
+SEGMENT_EVENTS = 50_000
+STATE_DB = "state.db"
+_DEDUP_WINDOW = 100_000
+
+EVENT_TYPES = ("trigger", "acknowledge", "resolve", "note")
+
+
+class IncidentError(Exception):
+    """Raised for malformed events or unknown incidents."""
+
+
+def parse_ts(value) -> float:
+    """Return ``value`` (epoch seconds or ISO 8601) as epoch seconds."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not value:
+        raise IncidentError("event has no timestamp")
+    ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def format_ts(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M:%SZ")
+
+
+def _fingerprint(*parts) -> str:
+    return hashlib.sha1("\0".join(str(p) for p in parts).encode()).hexdigest()[:16]
+
+
+# -- webhook normalization ---------------------------------------------
+
+_PD_TYPES = {
+    "incident.triggered": "trigger",
+    "incident.acknowledged": "acknowledge",
+    "incident.resolved": "resolve",
+    "incident.annotated": "note",
+}
+_OG_TYPES = {
+    "Create": "trigger",
+    "Acknowledge": "acknowledge",
+    "Close": "resolve",
+    "AddNote": "note",
+}
+
+
+def from_pagerduty(payload: dict) -> dict | None:
+    event = payload.get("event", payload)
+    kind = _PD_TYPES.get(event.get("event_type", ""))
+    if kind is None:
+        return None
+    data = event.get("data") or {}
+    # Notes carry the note object in ``data`` and reference their incident;
+    # every other event type carries the incident itself.
+    incident = (data.get("incident") or {}) if kind == "note" else data
+    service = (data.get("service") or incident.get("service") or {}).get("summary") or "unknown"
+    return {
+        "ts": parse_ts(event.get("occurred_at")),
+        "type": kind,
+        "source": "pagerduty",
+        "service": service,
+        "fingerprint": incident.get("id") or data.get("incident_key") or _fingerprint(service, data.get("title")),
+        "severity": data.get("priority", {}).get("summary") if isinstance(data.get("priority"), dict) else None,
+        "summary": data.get("title") or (data.get("content") if kind == "note" else "") or "",
+        "delivery": event.get("id"),
+    }
+
+
+def from_opsgenie(payload: dict) -> dict | None:
+    kind = _OG_TYPES.get(payload.get("action", ""))
+    if kind is None:
+        return None
+    alert = payload.get("alert") or {}
+    service = alert.get("entity") or alert.get("source") or "unknown"
+    ts = alert.get("updatedAt") or alert.get("createdAt")
+    return {
+        "ts": ts / 1000 if isinstance(ts, (int, float)) and ts > 1e11 else parse_ts(ts),
+        "type": kind,
+        "source": "opsgenie",
+        "service": service,
+        "fingerprint": alert.get("alias") or alert.get("alertId") or _fingerprint(service, alert.get("message")),
+        "severity": alert.get("priority"),
+        "summary": alert.get("message") or alert.get("note") or "",
+        "delivery": payload.get("id"),
+    }
+
+
+def normalize(payload: dict) -> dict | None:
+    """Normalize a PagerDuty, OpsGenie or already-normalized event.
+
+    Returns ``None`` for webhook types that carry no timeline information.
+    """
+    if not isinstance(payload, dict):
+        raise IncidentError(f"event is not an object: {json.dumps(payload)[:200]}")
+    if "event" in payload or "event_type" in payload:
+        return from_pagerduty(payload)
+    if "action" in payload and "alert" in payload:
+        return from_opsgenie(payload)
+    if payload.get("type") not in EVENT_TYPES:
+        raise IncidentError(f"unrecognized event: {json.dumps(payload)[:200]}")
+    event = dict(payload)
+    event["ts"] = parse_ts(event.get("ts"))
+    event.setdefault("service", "unknown")
+    event.setdefault("summary", "")
+    event.setdefault("fingerprint", _fingerprint(event["service"], event["summary"]))
+    return event
+
+
+# -- store -------------------------------------------------------------
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoint (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    next_incident INTEGER NOT NULL,
+    alerts INTEGER NOT NULL,
+    grouped INTEGER NOT NULL,
+    mtta_sum REAL NOT NULL,
+    mtta_n INTEGER NOT NULL,
+    mttr_sum REAL NOT NULL,
+    mttr_n INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO checkpoint VALUES (1, 1, 0, 0, 0.0, 0, 0.0, 0);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    count INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    min_ts REAL,
+    max_ts REAL
+);
+CREATE TABLE IF NOT EXISTS segment_services (
+    segment INTEGER NOT NULL,
+    service TEXT NOT NULL,
+    PRIMARY KEY (service, segment)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS incidents (
+    id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    service TEXT NOT NULL,
+    severity TEXT,
+    summary TEXT NOT NULL,
+    triggered REAL NOT NULL,
+    acknowledged REAL,
+    resolved REAL,
+    alerts INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS incident_segments (
+    incident TEXT NOT NULL,
+    segment INTEGER NOT NULL,
+    PRIMARY KEY (incident, segment)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS open_groups (
+    fingerprint TEXT PRIMARY KEY,
+    incident TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS volume (
+    service TEXT NOT NULL,
+    hour TEXT NOT NULL,
+    alerts INTEGER NOT NULL,
+    PRIMARY KEY (service, hour)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS seen (
+    seq INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE
+);
+"""
+
+_CHECKPOINT = ("next_incident", "alerts", "grouped", "mtta_sum", "mtta_n", "mttr_sum", "mttr_n")
+_INCIDENT = ("id", "fingerprint", "service", "severity", "summary", "triggered", "acknowledged", "resolved", "alerts")
+
+
+class TimelineStore:
+    """Segment-based event log with incrementally maintained aggregates."""
+
+    def __init__(self, workspace: str | os.PathLike, segment_events: int = SEGMENT_EVENTS):
+        self.workspace = Path(workspace)
+        self.root = self.workspace / TIMELINE_DIR
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.segment_events = segment_events
+        self.db = sqlite3.connect(self.root / STATE_DB, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.executescript(_SCHEMA)
+        self._recover()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "TimelineStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _segment_path(self, seg_id: int) -> Path:
+        return self.root / f"segment-{seg_id:06d}.jsonl"
+
+    def _recover(self) -> None:
+        """Cut segment bytes appended by a batch whose state never committed."""
+        for seg_id, committed in self.db.execute("SELECT id, bytes FROM segments"):
+            path = self._segment_path(seg_id)
+            try:
+                if path.stat().st_size > committed:
+                    os.truncate(path, committed)
+            except FileNotFoundError:
+                pass
+
+    def _checkpoint(self) -> dict:
+        row = self.db.execute(f"SELECT {', '.join(_CHECKPOINT)} FROM checkpoint").fetchone()
+        return dict(zip(_CHECKPOINT, row))
+
+    def _incident_row(self, incident_id: str) -> dict | None:
+        row = self.db.execute(f"SELECT {', '.join(_INCIDENT)} FROM incidents WHERE id = ?",
+                              (incident_id,)).fetchone()
+        return dict(zip(_INCIDENT, row)) if row else None
+
+    def _apply(self, event: dict, cp: dict) -> bool:
+        """Fold ``event`` into the aggregates. Returns False for a duplicate delivery."""
+        db = self.db
+        # Only a webhook's own delivery ID identifies a re-delivery; distinct
+        # alerts in a storm can share fingerprint, type and second.
+        key = event.get("delivery")
+        if key and not db.execute("INSERT OR IGNORE INTO seen (key) VALUES (?)", (key,)).rowcount:
+            return False
+
+        fp = event["fingerprint"]
+        row = db.execute("SELECT incident FROM open_groups WHERE fingerprint = ?", (fp,)).fetchone()
+        incident_id = row[0] if row else None
+
+        if event["type"] == "trigger":
+            cp["alerts"] += 1
+            hour = datetime.fromtimestamp(event["ts"], timezone.utc).strftime("%Y-%m-%dT%H")
+            db.execute(
+                "INSERT INTO volume VALUES (?, ?, 1) "
+                "ON CONFLICT (service, hour) DO UPDATE SET alerts = alerts + 1",
+                (event["service"], hour),
+            )
+            if incident_id is not None:
+                cp["grouped"] += 1
+                db.execute("UPDATE incidents SET alerts = alerts + 1 WHERE id = ?", (incident_id,))
+            else:
+                incident_id = f"INC-{cp['next_incident']:05d}"
+                cp["next_incident"] += 1
+                db.execute("INSERT INTO open_groups VALUES (?, ?)", (fp, incident_id))
+                db.execute(
+                    "INSERT INTO incidents VALUES (?, ?, ?, ?, ?, ?, NULL, NULL, 1)",
+                    (incident_id, fp, event["service"], event.get("severity"),
+                     event.get("summary") or "", event["ts"]),
+                )
+        elif incident_id is None:
+            # Ack/resolve/note for an unknown or already-closed group: keep
+            # it in the log, but it cannot affect any incident.
+            event["incident"] = None
+            return True
+
+        event["incident"] = incident_id
+        if event["type"] == "acknowledge":
+            triggered, acknowledged = db.execute(
+                "SELECT triggered, acknowledged FROM incidents WHERE id = ?", (incident_id,)
+            ).fetchone()
+            if acknowledged is None:
+                db.execute("UPDATE incidents SET acknowledged = ? WHERE id = ?", (event["ts"], incident_id))
+                cp["mtta_sum"] += event["ts"] - triggered
+                cp["mtta_n"] += 1
+        elif event["type"] == "resolve":
+            (triggered,) = db.execute("SELECT triggered FROM incidents WHERE id = ?", (incident_id,)).fetchone()
+            db.execute("UPDATE incidents SET resolved = ? WHERE id = ?", (event["ts"], incident_id))
+            cp["mttr_sum"] += event["ts"] - triggered
+            cp["mttr_n"] += 1
+            db.execute("DELETE FROM open_groups WHERE fingerprint = ?", (fp,))
+        return True
+
+    def ingest(self, events) -> dict:
+        """Append a batch of raw or normalized events (dicts or JSON lines).
+
+        The whole batch is normalized before anything is applied; payloads
+        that fail are skipped and reported under ``errors``. The rest is
+        applied and appended as one unit: segment data is fsync'd first and
+        the state transaction committed last, and bytes past the last
+        committed offset are cut on open, so a crash in between loses the
+        whole batch rather than half of it.
+
+        Returns counts of ``accepted``, ``duplicates`` (re-deliveries),
+        ``ignored`` (webhook types with no timeline meaning) and
+        ``rejected`` (malformed payloads).
+        """
+        normalized, errors, ignored = [], [], 0
+        for i, raw in enumerate(events):
+            try:
+                event = normalize(json.loads(raw) if isinstance(raw, (str, bytes)) else raw)
+            except (IncidentError, ValueError, TypeError, AttributeError) as exc:
+                errors.append(f"event {i}: {exc}")
+                continue
+            if event is None:
+                ignored += 1
+            else:
+                normalized.append(event)
+
+        db = self.db
+        sizes: dict[int, int] = {}
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            cp = self._checkpoint()
+            pending = [e for e in normalized if self._apply(e, cp)]
+            accepted = len(pending)
+            db.execute("DELETE FROM seen WHERE seq <= (SELECT MAX(seq) FROM seen) - ?", (_DEDUP_WINDOW,))
+            while pending:
+                segment = self._active_segment()
+                chunk = pending[:self.segment_events - segment["count"]]
+                pending = pending[len(chunk):]
+                sizes.setdefault(segment["id"], segment["bytes"])
+                self._append(segment, chunk)
+            db.execute(
+                f"UPDATE checkpoint SET {', '.join(f'{k} = ?' for k in _CHECKPOINT)}",
+                [cp[k] for k in _CHECKPOINT],
+            )
+            self._commit()
+        except BaseException:
+            db.execute("ROLLBACK")
+            for seg_id, size in sizes.items():
+                try:
+                    os.truncate(self._segment_path(seg_id), size)
+                except FileNotFoundError:
+                    pass
+            raise
+        return {
+            "accepted": accepted,
+            "duplicates": len(normalized) - accepted,
+            "ignored": ignored,
+            "rejected": len(errors),
+            "errors": errors,
+        }
+
+    def _commit(self) -> None:
+        self.db.execute("COMMIT")
+
+    def _active_segment(self) -> dict:
+        row = self.db.execute("SELECT id, count, bytes, min_ts, max_ts FROM segments ORDER BY id DESC LIMIT 1").fetchone()
+        if row is None or row[1] >= self.segment_events:
+            seg_id = row[0] + 1 if row else 1
+            self.db.execute("INSERT INTO segments VALUES (?, 0, 0, NULL, NULL)", (seg_id,))
+            return {"id": seg_id, "count": 0, "bytes": 0, "min_ts": None, "max_ts": None}
+        return dict(zip(("id", "count", "bytes", "min_ts", "max_ts"), row))
+
+    def _append(self, segment: dict, events: list[dict]) -> None:
+        data = "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in events).encode("utf-8")
+        with open(self._segment_path(segment["id"]), "ab") as fh:
+            fh.truncate(segment["bytes"])  # drop any uncommitted tail before appending
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        timestamps = [e["ts"] for e in events]
+        if segment["min_ts"] is not None:
+            timestamps += [segment["min_ts"], segment["max_ts"]]
+        self.db.execute(
+            "UPDATE segments SET count = ?, bytes = ?, min_ts = ?, max_ts = ? WHERE id = ?",
+            (segment["count"] + len(events), segment["bytes"] + len(data),
+             min(timestamps), max(timestamps), segment["id"]),
+        )
+        self.db.executemany(
+            "INSERT OR IGNORE INTO segment_services VALUES (?, ?)",
+            [(segment["id"], s) for s in {e["service"] for e in events}],
+        )
+        self.db.executemany(
+            "INSERT OR IGNORE INTO incident_segments VALUES (?, ?)",
+            [(i, segment["id"]) for i in {e["incident"] for e in events if e.get("incident")}],
+        )
+
+    # -- queries -------------------------------------------------------
+
+    def _read_segments(self, seg_ids):
+        for seg_id in seg_ids:
+            try:
+                with open(self._segment_path(seg_id), encoding="utf-8") as fh:
+                    for line in fh:
+                        yield json.loads(line)
+            except FileNotFoundError:
+                continue
+
+    def events(self, start: float | None = None, end: float | None = None, service: str | None = None):
+        """Yield events in ``[start, end)``, optionally for one service."""
+        candidates = [row[0] for row in self.db.execute(
+            "SELECT id FROM segments WHERE count > 0 "
+            "AND (?1 IS NULL OR max_ts >= ?1) AND (?2 IS NULL OR min_ts < ?2) "
+            "AND (?3 IS NULL OR id IN (SELECT segment FROM segment_services WHERE service = ?3)) "
+            "ORDER BY id",
+            (start, end, service),
+        )]
+        for event in self._read_segments(candidates):
+            if start is not None and event["ts"] < start:
+                continue
+            if end is not None and event["ts"] >= end:
+                continue
+            if service is not None and event["service"] != service:
+                continue
+            yield event
+
+    def incident(self, incident_id: str) -> tuple[dict, list[dict]]:
+        """Return an incident record and its events in time order."""
+        record = self._incident_row(incident_id)
+        if record is None:
+            raise IncidentError(f"unknown incident: {incident_id}")
+        record["segments"] = [row[0] for row in self.db.execute(
+            "SELECT segment FROM incident_segments WHERE incident = ? ORDER BY segment", (incident_id,)
+        )]
+        events = [e for e in self._read_segments(record["segments"]) if e.get("incident") == incident_id]
+        events.sort(key=lambda e: e["ts"])
+        return record, events
+
+    def metrics(self) -> dict:
+        cp = self._checkpoint()
+        (incidents,) = self.db.execute("SELECT COUNT(*) FROM incidents").fetchone()
+        (open_count,) = self.db.execute("SELECT COUNT(*) FROM open_groups").fetchone()
+        return {
+            "alerts": cp["alerts"],
+            "grouped_alerts": cp["grouped"],
+            "incidents": incidents,
+            "open": open_count,
+            "mtta_s": round(cp["mtta_sum"] / cp["mtta_n"], 1) if cp["mtta_n"] else None,
+            "mttr_s": round(cp["mttr_sum"] / cp["mttr_n"], 1) if cp["mttr_n"] else None,
+            "alerts_by_service": dict(self.db.execute(
+                "SELECT service, SUM(alerts) FROM volume GROUP BY service ORDER BY service"
+            )),
+        }
+
+    # -- rendering -----------------------------------------------------
+
+    def render_incident(self, incident_id: str) -> Path:
+        """Write ``incidents/<id>.md`` and return its path."""
+        record, events = self.incident(incident_id)
+        lines = [
+            f"# {incident_id}: {record['summary'] or record['service']}",
+            "",
+            f"- **Service**: {record['service']}",
+            f"- **Severity**: {record['severity'] or 'unclassified'}",
+            f"- **Status**: {'Resolved' if record['resolved'] else 'Acknowledged' if record['acknowledged'] else 'Triggered'}",
+            f"- **Alerts grouped**: {record['alerts']}",
+            "",
+            "## Timeline (UTC)",
+            "",
+            "| Time | Event | Source | Details |",
+            "|------|-------|--------|---------|",
+        ]
+        for e in events:
+            details = (e.get("summary") or "").replace("|", "\\|").replace("\n", " ")
+            lines.append(f"| {format_ts(e['ts'])} | {e['type']} | {e.get('source', '')} | {details} |")
+        return self._write(Path("incidents") / f"{incident_id}.md", lines)
+
+    def render_postmortem(self, incident_id: str) -> Path:
+        """Write a blameless post-mortem draft to ``postmortems/<id>.md``."""
+        record, events = self.incident(incident_id)
+
+        def duration(end):
+            return f"{(end - record['triggered']) / 60:.1f} min" if end else "n/a"
+
+        lines = [
+            f"# Post-Mortem: {incident_id} {record['summary']}".rstrip(),
+            "",
+            f"- **Service**: {record['service']}",
+            f"- **Severity**: {record['severity'] or 'unclassified'}",
+            f"- **Detected**: {format_ts(record['triggered'])}",
+            f"- **Time to acknowledge**: {duration(record['acknowledged'])}",
+            f"- **Time to resolve**: {duration(record['resolved'])}",
+            "",
+            "## Summary",
+            "",
+            "## Impact",
+            "",
+            "## Timeline (UTC)",
+            "",
+        ]
+        lines += [f"- {format_ts(e['ts'])} — {e['type']}: {e.get('summary', '')}".rstrip(": ") for e in events]
+        lines += [
+            "",
+            "## Root Cause",
+            "",
+            "## What Went Well",
+            "",
+            "## What Could Be Improved",
+            "",
+            "## Action Items",
+            "",
+            "| Action | Owner | Priority | Due |",
+            "|--------|-------|----------|-----|",
+        ]
+        return self._write(Path("postmortems") / f"{incident_id}.md", lines)
+
+    def _write(self, rel: Path, lines: list[str]) -> Path:
+        path = self.workspace / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return path
+
+
+def read_replay(path: Path, batch_size: int = 1000):
+    """Yield batches of raw lines from a JSONL replay file.
+
+    Lines are parsed by :meth:`TimelineStore.ingest`, which reports bad ones
+    instead of aborting the replay.
+    """
+    batch = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                batch.append(line)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tools.incidents", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workspace", type=Path, default=Path("."), help="machine workspace directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_ingest = sub.add_parser("ingest", help="ingest a webhook replay file (JSONL)")
+    p_ingest.add_argument("replay", type=Path)
+    p_ingest.add_argument("--batch-size", type=int, default=1000)
+    sub.add_parser("metrics", help="print MTTA/MTTR and alert volume")
+    p_query = sub.add_parser("query", help="print events in a time range")
+    p_query.add_argument("--since", help="ISO 8601 or epoch seconds")
+    p_query.add_argument("--until", help="ISO 8601 or epoch seconds")
+    p_query.add_argument("--service")
+    p_render = sub.add_parser("render", help="write incidents/<id>.md")
+    p_render.add_argument("incident")
+    p_render.add_argument("--postmortem", action="store_true", help="also write postmortems/<id>.md")
+    args = parser.parse_args(argv)
+
+    store = TimelineStore(args.workspace)
+    try:
+        if args.command == "ingest":
+            totals = {"accepted": 0, "duplicates": 0, "ignored": 0, "rejected": 0}
+            for n, batch in enumerate(read_replay(args.replay, args.batch_size)):
+                result = store.ingest(batch)
+                for error in result.pop("errors"):
+                    print(f"batch {n}, {error}", file=sys.stderr)
+                for key, value in result.items():
+                    totals[key] += value
+            print(json.dumps(totals))
+        elif args.command == "metrics":
+            print(json.dumps(store.metrics(), indent=2))
+        elif args.command == "query":
+            def bound(v):
+                return None if v is None else parse_ts(float(v) if v.replace(".", "").isdigit() else v)
+
+            for event in store.events(bound(args.since), bound(args.until), args.service):
+                print(json.dumps(event))
+        else:
+            print(store.render_incident(args.incident))
+            if args.postmortem:
+                print(store.render_postmortem(args.incident))
+    except (IncidentError, ValueError) as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+"""Prebuilt, memory-mappable index of the machine registry.
+
+``build`` compiles every template's metadata (README description, file
+manifest with hashes and modes, permissions from ``.claude/settings.json``
+and MCP servers from ``.mcp.json``) into one versioned binary file. Readers
+``mmap`` it and answer lookups without touching ``machines/``.
+
+File layout (little-endian)::
+
+    header    magic "LGIX", version u16, reserved u16,
+              machines_off u64,
+              templates_off u64, templates_slots u32,
+              servers_off u64,   servers_slots u32
+    tables    open-addressed hash tables of (key_hash u64, record_off u64)
+    records   u32 length + UTF-8 JSON
+
+Keys are hashed with an 8-byte BLAKE2b so the table is stable across
+processes. Each record repeats its key, so a probe confirms a hit by
+comparing it. Rebuilds are incremental: each template record stores a stat
+signature of its source files, and only templates whose signature changed
+are re-parsed and re-hashed.
+
+Usage::
+
+    python -m tools.index build --readme
+    python -m tools.index list
+    python -m tools.index get incident-commander
+    python -m tools.index uses memory
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+from pathlib import Path
+
+from tools.layers import Resolver, read_base, split_frontmatter
+from tools.materialize import hash_file
+from tools.registry import (
+    DEFAULT_TEMPLATE,
+    MACHINES_DIR,
+    REPO_ROOT,
+    iter_template_files,
+    template_names,
+)
+from tools.timing import timed
+
+DEFAULT_INDEX = REPO_ROOT / ".cache" / "registry.idx"
+README_PATH = REPO_ROOT / "README.md"
+
+MAGIC = b"LGIX"
+VERSION = 1
+_HEADER = struct.Struct("<4sHHQQIQI")
+_SLOT = struct.Struct("<QQ")
+_LEN = struct.Struct("<I")
+
+TABLE_START = "<!-- machines:start -->"
+TABLE_END = "<!-- machines:end -->"
+
+
+class RegistryIndexError(Exception):
+    """Raised for a missing, corrupt or incompatible index file."""
+
+
+def _key_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+
+
+def _load_json(path: Path) -> dict:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+    except FileNotFoundError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def readme_description(text: str) -> str:
+    """Return the README's ``description:`` frontmatter.
+
+    Without one, falls back to the first sentence of the first paragraph
+    after the title.
+    """
+    meta, body = split_frontmatter(text)
+    if meta.get("description"):
+        return meta["description"]
+    paragraph: list[str] = []
+    for line in body.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            if paragraph:
+                break
+            continue
+        if stripped.startswith(("#", "|", "```", "-", "*", ">")):
+            if paragraph:
+                break
+            continue
+        paragraph.append(stripped)
+    prose = " ".join(paragraph)
+    match = re.match(r"(.+?[.!?])(\s|$)", prose)
+    return match.group(1) if match else prose
+
+
+def _signature(listing) -> list:
+    return [[rel, st.st_size, st.st_mtime_ns, st.st_mode] for rel, _, st in listing]
+
+
+@timed("index.compile")
+def compile_template(
+    name: str,
+    machines_dir: Path = MACHINES_DIR,
+    previous: dict | None = None,
+    resolver: Resolver | None = None,
+) -> dict:
+    """Build the index record for one template.
+
+    ``previous`` is the record from the last build; when its signature still
+    matches the tree it is returned unchanged. Pass one ``resolver`` for a
+    whole build so shared base layers are hashed once.
+    """
+    root = machines_dir / name
+    listing = [(rel, entry.path, entry.stat()) for rel, entry in iter_template_files(root)]
+    signature = _signature(listing)
+    base = read_base(root)
+    if base is not None:
+        # Inherited settings change with the base, so the base's chain is
+        # part of the signature (the template's own files are already in it).
+        resolver = resolver or Resolver(machines_dir, cache_dir=None)
+        signature.append(["@chain", resolver.chain_key(base)])
+    if previous is not None and previous.get("signature") == signature:
+        return previous
+
+    old_hashes = {}
+    if previous is not None:
+        old_sig = {s[0]: s for s in previous.get("signature", [])}
+        for path, size, mode, sha in previous.get("files", []):
+            old_hashes[path] = (old_sig.get(path), sha)
+
+    files = []
+    for (rel, path, st), sig in zip(listing, signature[:len(listing)]):
+        cached = old_hashes.get(rel)
+        sha = cached[1] if cached and cached[0] == sig else hash_file(path)
+        files.append([rel, st.st_size, st.st_mode & 0o7777, sha])
+
+    readme = root / "README.md"
+    description = readme_description(readme.read_text(encoding="utf-8")) if readme.exists() else ""
+    if base is not None:
+        merged = resolver.resolve(name).files
+        settings = json.loads(merged[".claude/settings.json"][1]) if ".claude/settings.json" in merged else {}
+        mcp = json.loads(merged[".mcp.json"][1]) if ".mcp.json" in merged else {}
+    else:
+        settings = _load_json(root / ".claude" / "settings.json")
+        mcp = _load_json(root / ".mcp.json")
+    permissions = settings.get("permissions") or {}
+    servers = mcp.get("mcpServers") or {}
+
+    return {
+        "name": name,
+        "base": base,
+        "description": description,
+        "files": files,
+        "permissions": {
+            "allow": list(permissions.get("allow", [])),
+            "deny": list(permissions.get("deny", [])),
+        },
+        "mcp_servers": servers,
+        "signature": signature,
+    }
+
+
+def _table_size(n: int) -> int:
+    size = 8
+    while size < n * 2:
+        size <<= 1
+    return size
+
+
+def write_index(records: list[dict], path: Path) -> None:
+    """Serialize template records into the binary index at ``path``."""
+    records = sorted(records, key=lambda r: r["name"])
+    by_server: dict[str, list[str]] = {}
+    for r in records:
+        for server in r["mcp_servers"]:
+            by_server.setdefault(server, []).append(r["name"])
+
+    t_slots = _table_size(len(records))
+    s_slots = _table_size(len(by_server))
+    t_off = _HEADER.size
+    s_off = t_off + t_slots * _SLOT.size
+    data_off = s_off + s_slots * _SLOT.size
+
+    blob = bytearray()
+
+    def put(obj) -> int:
+        off = data_off + len(blob)
+        payload = json.dumps(obj, separators=(",", ":"), sort_keys=True).encode()
+        blob.extend(_LEN.pack(len(payload)))
+        blob.extend(payload)
+        return off
+
+    machines_off = put([{"name": r["name"], "description": r["description"]} for r in records])
+    t_table = [(0, 0)] * t_slots
+    for r in records:
+        _insert(t_table, r["name"], put(r))
+    s_table = [(0, 0)] * s_slots
+    for server, names in sorted(by_server.items()):
+        _insert(s_table, server, put({"name": server, "templates": names}))
+
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, 0, machines_off, t_off, t_slots, s_off, s_slots))
+    for table in (t_table, s_table):
+        for slot in table:
+            out.extend(_SLOT.pack(*slot))
+    out.extend(blob)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(out)
+    os.replace(tmp, path)
+
+
+def _insert(table: list, key: str, offset: int) -> None:
+    h = _key_hash(key)
+    mask = len(table) - 1
+    i = h & mask
+    while table[i][1]:
+        i = (i + 1) & mask
+    table[i] = (h, offset)
+
+
+class RegistryIndex:
+    """Read-only view over an index file.
+
+    The file is mapped once; every lookup is a hash probe plus decoding a
+    single JSON record.
+    """
+
+    def __init__(self, path: str | os.PathLike = DEFAULT_INDEX):
+        try:
+            with open(path, "rb") as fh:
+                self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as exc:
+            raise RegistryIndexError(f"cannot open index {path}: {exc}") from exc
+        if len(self._mm) < _HEADER.size:
+            raise RegistryIndexError(f"truncated index: {path}")
+        (magic, version, _, self._machines_off, self._t_off, self._t_slots,
+         self._s_off, self._s_slots) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise RegistryIndexError(f"not a registry index: {path}")
+        if version != VERSION:
+            raise RegistryIndexError(f"unsupported index version {version} (expected {VERSION})")
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __enter__(self) -> "RegistryIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _record(self, offset: int):
+        (length,) = _LEN.unpack_from(self._mm, offset)
+        start = offset + _LEN.size
+        return json.loads(self._mm[start:start + length])
+
+    def _lookup(self, table_off: int, slots: int, key: str):
+        h = _key_hash(key)
+        mask = slots - 1
+        i = h & mask
+        while True:
+            slot_h, rec_off = _SLOT.unpack_from(self._mm, table_off + i * _SLOT.size)
+            if not rec_off:
+                return None
+            if slot_h == h:
+                record = self._record(rec_off)
+                if record["name"] == key:
+                    return record
+            i = (i + 1) & mask
+
+    def list_machines(self) -> list[dict]:
+        """Return ``[{"name", "description"}, ...]`` sorted by name."""
+        return self._record(self._machines_off)
+
+    def get(self, name: str) -> dict | None:
+        """Return the full record for template ``name``, or ``None``."""
+        return self._lookup(self._t_off, self._t_slots, name)
+
+    def templates_using(self, server: str) -> list[str]:
+        """Return the names of templates that declare MCP server ``server``."""
+        record = self._lookup(self._s_off, self._s_slots, server)
+        return record["templates"] if record else []
+
+    def records(self) -> list[dict]:
+        return [self.get(m["name"]) for m in self.list_machines()]
+
+
+@timed("index.build")
+def build(
+    path: Path = DEFAULT_INDEX, machines_dir: Path = MACHINES_DIR
+) -> tuple[list[dict], list[str]]:
+    """Incrementally rebuild the index. Returns ``(records, rebuilt_names)``."""
+    previous: dict[str, dict] = {}
+    try:
+        with RegistryIndex(path) as old:
+            previous = {r["name"]: r for r in old.records()}
+    except RegistryIndexError:
+        pass
+
+    records, rebuilt = [], []
+    resolver = Resolver(machines_dir, cache_dir=None, snapshot=True)
+    for name in template_names(machines_dir):
+        record = compile_template(name, machines_dir, previous.get(name), resolver)
+        if record is not previous.get(name):
+            rebuilt.append(name)
+        records.append(record)
+    if rebuilt or set(previous) != {r["name"] for r in records}:
+        write_index(records, path)
+    return records, rebuilt
+
+
+def render_table(machines: list[dict]) -> str:
+    """Render the README table, listing the default template first."""
+    lines = ["| Machine | Description |", "|---------|-------------|"]
+    for m in sorted(machines, key=lambda m: m["name"] != DEFAULT_TEMPLATE):
+        description = m["description"].replace("|", "\\|").replace("\n", " ")
+        lines.append(f"| [{m['name']}](./machines/{m['name']}) | {description} |")
+    return "\n".join(lines)
+
+
+def update_readme(machines: list[dict], readme: Path = README_PATH) -> bool:
+    """Rewrite the table between the machines markers. Returns True if changed."""
+    text = readme.read_text(encoding="utf-8")
+    start, end = text.find(TABLE_START), text.find(TABLE_END)
+    if start < 0 or end < start:
+        raise ValueError(f"{readme} is missing {TABLE_START} / {TABLE_END} markers")
+    new = f"{text[:start]}{TABLE_START}\n{render_table(machines)}\n{text[end:]}"
+    if new == text:
+        return False
+    readme.write_text(new, encoding="utf-8")
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tools.index", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--index", type=Path, default=DEFAULT_INDEX, help="index file path")
+    parser.add_argument("--machines", type=Path, default=MACHINES_DIR, help="templates directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="incrementally rebuild the index")
+    p_build.add_argument("--readme", action="store_true", help="regenerate the root README table")
+    p_build.add_argument("--check", action="store_true", help="fail if the README table is stale")
+    sub.add_parser("list", help="list machines")
+    sub.add_parser("get", help="print a template record").add_argument("name")
+    sub.add_parser("uses", help="templates declaring an MCP server").add_argument("server")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        records, rebuilt = build(args.index, args.machines)
+        print(f"indexed {len(records)} templates ({len(rebuilt)} rebuilt) -> {args.index}")
+        machines = [{"name": r["name"], "description": r["description"]} for r in records]
+        if args.check:
+            text = README_PATH.read_text(encoding="utf-8")
+            if render_table(machines) not in text:
+                print("README.md machines table is out of date; run with --readme", file=sys.stderr)
+                return 1
+        if args.readme and update_readme(machines, README_PATH):
+            print(f"updated {README_PATH.name}")
+        return 0
+
+    try:
+        index = RegistryIndex(args.index)
+    except RegistryIndexError as exc:
+        print(f"{exc}; run `python -m tools.index build` first", file=sys.stderr)
+        return 1
+    with index:
+        if args.command == "list":
+            for m in index.list_machines():
+                print(f"{m['name']}\t{m['description']}")
+        elif args.command == "get":
+            record = index.get(args.name)
+            if record is None:
+                print(f"unknown machine template: {args.name}", file=sys.stderr)
+                return 1
+            json.dump(record, sys.stdout, indent=2)
+            print()
+        else:
+            for name in index.templates_using(args.server):
+                print(name)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
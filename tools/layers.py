@@ -0,0 +1,381 @@
+"""Layered template inheritance.
+
+A template may declare a base in YAML frontmatter at the top of its
+``CLAUDE.md``::
+
+    ---
+    base: anything-machine
+    ---
+
+and then only ship what differs. Resolution overlays the template on its
+base chain, root first:
+
+``CLAUDE.md``
+    Split into a preamble and ``## `` sections. A non-empty child preamble
+    replaces the base preamble; a child section replaces the base section
+    with the same heading, or is appended if the heading is new. A heading
+    written ``## +Heading`` appends its body to the base section instead.
+    Headings inside fenced code blocks are part of the section's text.
+``.claude/settings.json``, ``.mcp.json``
+    Deep-merged: objects merge key by key, scalars and lists are
+    overridden, and ``null`` removes a key (e.g. a base MCP server). The
+    ``permissions`` lists in ``settings.json`` are the exception: they are
+    concatenated without duplicates, so a child adds rules to its base.
+any other file
+    The child's copy wins.
+
+Resolution is lazy and cached on disk under a key derived from the content
+of every layer in the chain, so editing a base invalidates exactly the
+templates that inherit from it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+from tools.registry import (
+    MACHINES_DIR,
+    REPO_ROOT,
+    iter_template_files,
+    template_dir,
+    template_names,
+)
+from tools.timing import timed
+
+DEFAULT_CACHE = REPO_ROOT / ".cache" / "layers"
+# Part of every chain key; bump when merge semantics change.
+MERGE_VERSION = 2
+
+_FRONTMATTER_RE = re.compile(r"\A---\r?\n(.*?)\r?\n---\r?\n?", re.S)
+_FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+
+# List-valued keys that accumulate across layers instead of being replaced.
+SETTINGS_UNION = frozenset({
+    ("permissions", "allow"),
+    ("permissions", "deny"),
+    ("permissions", "ask"),
+})
+
+
+class LayerError(Exception):
+    """Raised for an unknown base or an inheritance cycle."""
+
+
+def split_frontmatter(text: str) -> tuple[dict[str, str], str]:
+    """Split ``key: value`` frontmatter from ``text``. Returns ``(meta, body)``."""
+    match = _FRONTMATTER_RE.match(text)
+    if not match:
+        return {}, text
+    meta = {}
+    for line in match.group(1).splitlines():
+        key, sep, value = line.partition(":")
+        if sep and key.strip():
+            meta[key.strip()] = value.strip().strip("'\"")
+    return meta, text[match.end():]
+
+
+def read_base(root: Path) -> str | None:
+    """Return the ``base`` declared in ``root/CLAUDE.md``, if any."""
+    try:
+        with open(root / "CLAUDE.md", encoding="utf-8") as fh:
+            head = fh.read(4096)
+    except FileNotFoundError:
+        return None
+    return split_frontmatter(head)[0].get("base") or None
+
+
+def _section_starts(body: str) -> list[int]:
+    """Offsets of ``## `` heading lines outside fenced code blocks."""
+    starts, fence, offset = [], None, 0
+    for line in body.splitlines(keepends=True):
+        match = _FENCE_RE.match(line)
+        if fence is None:
+            if match:
+                fence = match.group(1)
+            elif line.startswith("## "):
+                starts.append(offset)
+        elif match and match.group(1)[0] == fence[0] and len(match.group(1)) >= len(fence) \
+                and not line[match.end():].strip():
+            fence = None
+        offset += len(line)
+    return starts
+
+
+def split_sections(body: str) -> tuple[str, list[tuple[str, str]]]:
+    """Split markdown into its preamble and ``(heading, text)`` per ``## `` section.
+
+    Headings may repeat; sections are returned in document order.
+    """
+    starts = _section_starts(body)
+    if not starts:
+        return body, []
+    preamble = body[:starts[0]]
+    sections = []
+    for start, end in zip(starts, starts[1:] + [len(body)]):
+        chunk = body[start:end]
+        heading, _, rest = chunk.partition("\n")
+        sections.append((heading[3:].strip(), rest))
+    return preamble, sections
+
+
+def merge_claude_md(base: str, child: str) -> str:
+    _, base_body = split_frontmatter(base)
+    _, child_body = split_frontmatter(child)
+    preamble, sections = split_sections(base_body)
+    merged = [list(section) for section in sections]
+
+    child_preamble, child_sections = split_sections(child_body)
+    if child_preamble.strip():
+        preamble = child_preamble
+    for heading, text in child_sections:
+        append = heading.startswith("+")
+        if append:
+            heading = heading[1:].strip()
+        # Only the first base section with a repeated heading is targeted.
+        target = next((s for s in merged if s[0] == heading), None)
+        if target is None:
+            merged.append([heading, text])
+        elif append:
+            target[1] = target[1].rstrip("\n") + "\n\n" + text.lstrip("\n")
+        else:
+            target[1] = text
+
+    out = preamble
+    for heading, text in merged:
+        if out and not out.endswith("\n\n"):
+            out = out.rstrip("\n") + "\n\n"
+        out += f"## {heading}\n{text}"
+    return out
+
+
+def deep_merge(base, overlay, union=frozenset(), _path=()):
+    """Merge ``overlay`` onto ``base`` without mutating either.
+
+    Lists are replaced, except at key paths in ``union`` (tuples of keys),
+    where the overlay's new items are appended.
+    """
+    if isinstance(base, dict) and isinstance(overlay, dict):
+        out = dict(base)
+        for key, value in overlay.items():
+            if value is None:
+                out.pop(key, None)
+            elif key in out:
+                out[key] = deep_merge(out[key], value, union, _path + (key,))
+            else:
+                out[key] = value
+        return out
+    if isinstance(base, list) and isinstance(overlay, list) and _path in union:
+        out = list(base)
+        for item in overlay:
+            if item not in out:
+                out.append(item)
+        return out
+    return overlay
+
+
+def merge_json(base: str, child: str, union=frozenset()) -> str:
+    return json.dumps(deep_merge(json.loads(base), json.loads(child), union), indent=2) + "\n"
+
+
+def merge_settings(base: str, child: str) -> str:
+    return merge_json(base, child, SETTINGS_UNION)
+
+
+MERGERS = {
+    "CLAUDE.md": merge_claude_md,
+    ".claude/settings.json": merge_settings,
+    ".mcp.json": merge_json,
+}
+
+
+@dataclass
+class Resolved:
+    """A fully merged template: ``files`` maps relative path to ``(mode, data)``."""
+
+    name: str
+    key: str
+    chain: list[str]
+    files: dict[str, tuple[int, bytes]]
+
+
+class Resolver:
+    """Resolves templates against their base chain, caching merged output.
+
+    Per-layer digests are memoized on a stat signature, so repeated
+    resolution in one process only stats the chain's files. With
+    ``snapshot=True`` the tree is assumed not to change for the resolver's
+    lifetime and chains and digests are computed once per layer, which is
+    what a single pass over the registry wants.
+    """
+
+    def __init__(
+        self,
+        machines_dir: Path = MACHINES_DIR,
+        cache_dir: Path | None = DEFAULT_CACHE,
+        snapshot: bool = False,
+    ):
+        self.machines_dir = Path(machines_dir)
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.snapshot = snapshot
+        self._digests: dict[str, tuple[list, str]] = {}
+        self._chains: dict[str, list[str]] = {}
+        self._resolved: dict[str, Resolved] = {}
+
+    def chain(self, name: str) -> list[str]:
+        """Return the inheritance chain for ``name``, root first."""
+        if name in self._chains:
+            return list(self._chains[name])
+        chain: list[str] = []
+        current: str | None = name
+        while current is not None:
+            if current in chain:
+                raise LayerError(f"inheritance cycle: {' -> '.join(chain + [current])}")
+            try:
+                root = template_dir(current, self.machines_dir)
+            except KeyError:
+                raise LayerError(f"{chain[-1] if chain else name}: unknown base {current!r}") from None
+            chain.append(current)
+            current = read_base(root)
+        chain.reverse()
+        if self.snapshot:
+            self._chains[name] = chain
+        return list(chain)
+
+    def layer_digest(self, name: str) -> str:
+        if self.snapshot and name in self._digests:
+            return self._digests[name][1]
+        root = template_dir(name, self.machines_dir)
+        listing = [(rel, entry.path, entry.stat()) for rel, entry in iter_template_files(root)]
+        signature = [[rel, st.st_size, st.st_mtime_ns, st.st_mode] for rel, _, st in listing]
+        memo = self._digests.get(name)
+        if memo and memo[0] == signature:
+            return memo[1]
+        h = hashlib.sha256()
+        for rel, path, st in listing:
+            with open(path, "rb") as fh:
+                h.update(f"{rel}\0{st.st_mode & 0o7777:o}\0".encode())
+                h.update(hashlib.sha256(fh.read()).digest())
+        digest = h.hexdigest()
+        self._digests[name] = (signature, digest)
+        return digest
+
+    def chain_key(self, name: str) -> str:
+        h = hashlib.sha256(f"merge-v{MERGE_VERSION}\n".encode())
+        for layer in self.chain(name):
+            h.update(f"{layer}\0{self.layer_digest(layer)}\n".encode())
+        return h.hexdigest()
+
+    def dependents(self, name: str) -> list[str]:
+        """Return templates whose chain includes ``name`` (excluding itself)."""
+        return [
+            t for t in template_names(self.machines_dir)
+            if t != name and name in self.chain(t)
+        ]
+
+    @timed("layers.resolve")
+    def resolve(self, name: str) -> Resolved:
+        key = self.chain_key(name)
+        cached = self._resolved.get(name)
+        if cached and cached.key == key:
+            return cached
+        resolved = self._load(name, key)
+        if resolved is None:
+            resolved = self._merge(name, key)
+            self._store(resolved)
+        self._resolved[name] = resolved
+        return resolved
+
+    def _merge(self, name: str, key: str) -> Resolved:
+        chain = self.chain(name)
+        files: dict[str, tuple[int, bytes]] = {}
+        for layer in chain:
+            root = template_dir(layer, self.machines_dir)
+            for rel, entry in iter_template_files(root):
+                with open(entry.path, "rb") as fh:
+                    data = fh.read()
+                mode = entry.stat().st_mode & 0o7777
+                merger = MERGERS.get(rel)
+                if merger and rel in files:
+                    data = merger(files[rel][1].decode("utf-8"), data.decode("utf-8")).encode("utf-8")
+                files[rel] = (mode, data)
+        if "CLAUDE.md" in files:
+            mode, data = files["CLAUDE.md"]
+            files["CLAUDE.md"] = (mode, split_frontmatter(data.decode("utf-8"))[1].encode("utf-8"))
+        return Resolved(name, key, chain, dict(sorted(files.items())))
+
+    def _load(self, name: str, key: str) -> Resolved | None:
+        if self.cache_dir is None:
+            return None
+        root = self.cache_dir / key
+        meta_path = root / ".layers.json"
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+        files = {}
+        for rel, mode in meta["files"]:
+            with open(root / "files" / rel, "rb") as fh:
+                files[rel] = (mode, fh.read())
+        return Resolved(name, key, meta["chain"], files)
+
+    def _store(self, resolved: Resolved) -> None:
+        if self.cache_dir is None:
+            return
+        final = self.cache_dir / resolved.key
+        if final.exists():
+            return
+        tmp = self.cache_dir / f".{resolved.key}.{os.getpid()}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        for rel, (_, data) in resolved.files.items():
+            path = tmp / "files" / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+        meta = {"chain": resolved.chain, "files": [[rel, mode] for rel, (mode, _) in resolved.files.items()]}
+        (tmp / ".layers.json").write_text(json.dumps(meta))
+        try:
+            os.replace(tmp, final)
+        except OSError:  # lost a race with another resolver
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tools.layers", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--machines", type=Path, default=MACHINES_DIR, help="templates directory")
+    parser.add_argument("--cache", type=Path, default=DEFAULT_CACHE, help="resolved output cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("chain", help="print a template's inheritance chain").add_argument("template")
+    sub.add_parser("dependents", help="templates inheriting from a base").add_argument("template")
+    p_show = sub.add_parser("show", help="print a resolved file")
+    p_show.add_argument("template")
+    p_show.add_argument("path", nargs="?", default="CLAUDE.md")
+    args = parser.parse_args(argv)
+
+    resolver = Resolver(args.machines, args.cache)
+    try:
+        if args.command == "chain":
+            print(" -> ".join(resolver.chain(args.template)))
+        elif args.command == "dependents":
+            for name in resolver.dependents(args.template):
+                print(name)
+        else:
+            files = resolver.resolve(args.template).files
+            if args.path not in files:
+                print(f"{args.template}: no file {args.path}", file=sys.stderr)
+                return 1
+            sys.stdout.write(files[args.path][1].decode("utf-8", "replace"))
+    except (LayerError, KeyError) as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,412 @@
+"""Copy-on-write materialization of machine templates into workspaces.
+
+A template is compiled once into a content-addressed *manifest* (relative
+path, size, mode and SHA-256 per file) whose blobs live in a shared object
+store. Materializing a workspace then only creates directories and clones
+blobs out of the store, so provisioning cost no longer depends on re-reading
+the template tree.
+
+Blobs are placed with the cheapest strategy the filesystem supports:
+
+``reflink``
+    ``FICLONE`` copy-on-write clone (btrfs, XFS, overlay on those).
+``hardlink``
+    Shares the inode with the store. Only used when explicitly allowed,
+    because an in-place edit in one workspace would be visible in all of
+    them; store blobs are made read-only to make that less likely. Files
+    keep their execute bits through per-mode link variants of the blob.
+``copy``
+    ``shutil.copyfile``, which uses ``copy_file_range``/``sendfile`` where
+    available.
+
+Usage::
+
+    python -m tools.materialize manifest anything-machine
+    python -m tools.materialize provision anything-machine /srv/ws/a /srv/ws/b
+"""
+
+from __future__ import annotations
+
+import argparse
+import errno
+import hashlib
+import json
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from tools.layers import Resolved, Resolver, read_base
+from tools.registry import (
+    DEFAULT_TEMPLATE,
+    MACHINES_DIR,
+    REPO_ROOT,
+    iter_template_files,
+    template_dir,
+)
+from tools.timing import timed
+
+DEFAULT_STORE = REPO_ROOT / ".cache" / "materialize"
+MANIFEST_VERSION = 1
+STRATEGIES = ("reflink", "hardlink", "copy")
+
+# Linux FICLONE ioctl: _IOW(0x94, 9, int).
+_FICLONE = 0x40049409
+_CHUNK = 1 << 20
+# Errors meaning a strategy cannot work on this filesystem at all, as opposed
+# to a failure placing one particular file.
+_UNSUPPORTED = frozenset({errno.EXDEV, errno.EOPNOTSUPP, errno.EINVAL, errno.EPERM, errno.ENOTTY})
+
+
+@dataclass(frozen=True)
+class FileEntry:
+    path: str
+    size: int
+    mode: int
+    sha256: str
+
+
+@dataclass
+class Manifest:
+    template: str
+    digest: str
+    files: list[FileEntry]
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(f.size for f in self.files)
+
+    def to_json(self) -> dict:
+        return {
+            "version": MANIFEST_VERSION,
+            "template": self.template,
+            "digest": self.digest,
+            "files": [[f.path, f.size, f.mode, f.sha256] for f in self.files],
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "Manifest":
+        if data.get("version") != MANIFEST_VERSION:
+            raise ValueError(f"unsupported manifest version: {data.get('version')}")
+        files = [FileEntry(p, s, m, h) for p, s, m, h in data["files"]]
+        return cls(data["template"], data["digest"], files)
+
+
+@dataclass
+class Result:
+    destination: Path
+    latency_ms: float
+    files: int
+    strategies: dict[str, int] = field(default_factory=dict)
+    error: str | None = None
+
+
+def hash_file(path: str | os.PathLike) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        while chunk := fh.read(_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _publish(dest: Path, fill, mode: int) -> None:
+    """Atomically create ``dest`` with ``mode`` from ``fill(tmp_path)``.
+
+    The temporary file is unique per call, so concurrent writers of the same
+    blob never share it. It is published with a hardlink rather than a
+    rename: replacing a blob that another thread is linking would leave that
+    thread linking an unlinked inode, which fails with ``ENOENT``. Losing the
+    race is success, since blobs are content-addressed.
+    """
+    fd, tmp = tempfile.mkstemp(prefix=f".{dest.name}.", suffix=".tmp", dir=dest.parent)
+    os.close(fd)
+    try:
+        fill(tmp)
+        os.chmod(tmp, mode)
+        try:
+            os.link(tmp, dest)
+        except FileExistsError:
+            pass
+        except OSError as exc:
+            if exc.errno not in _UNSUPPORTED:
+                raise
+            os.replace(tmp, dest)
+    finally:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+
+
+def _manifest_digest(files: list[FileEntry]) -> str:
+    h = hashlib.sha256()
+    for f in files:
+        h.update(f"{f.path}\0{f.mode:o}\0{f.sha256}\n".encode())
+    return h.hexdigest()
+
+
+class ObjectStore:
+    """Content-addressed blob store plus cached manifests.
+
+    Manifests are cached next to the blobs together with a stat signature of
+    the source tree, so an unchanged template is never re-hashed.
+    """
+
+    def __init__(self, root: Path = DEFAULT_STORE):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.manifests = self.root / "manifests"
+        self._resolvers: dict[Path, Resolver] = {}
+
+    def object_path(self, sha256: str) -> Path:
+        return self.objects / sha256[:2] / sha256
+
+    def link_path(self, sha256: str, mode: int) -> Path:
+        """Return a read-only blob with ``mode``'s execute bits, for hardlinking.
+
+        Hardlinks share the inode and therefore its mode, so each distinct
+        mode gets its own variant of the blob, created on first use.
+        """
+        mode = (mode & 0o555) | 0o444
+        base = self.object_path(sha256)
+        if mode == 0o444:
+            return base
+        path = base.with_name(f"{sha256}.{mode:o}")
+        if not path.exists():
+            _publish(path, lambda tmp: shutil.copyfile(base, tmp), mode)
+        return path
+
+    def _manifest_path(self, template: str) -> Path:
+        return self.manifests / f"{template}.json"
+
+    def _ingest(self, src: str, sha256: str) -> None:
+        dest = self.object_path(sha256)
+        if dest.exists():
+            return
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        _publish(dest, lambda tmp: shutil.copyfile(src, tmp), 0o444)
+
+    def _ingest_bytes(self, data: bytes, sha256: str) -> None:
+        dest = self.object_path(sha256)
+        if dest.exists():
+            return
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        _publish(dest, lambda tmp: Path(tmp).write_bytes(data), 0o444)
+
+    def resolved_manifest(self, resolved: Resolved) -> Manifest:
+        """Ingest a layered template's merged files and return their manifest.
+
+        Files inherited unchanged from a base hash to the same blobs, so every
+        template in a chain shares the base layer's objects.
+        """
+        files = []
+        for rel, (mode, data) in resolved.files.items():
+            sha = hashlib.sha256(data).hexdigest()
+            self._ingest_bytes(data, sha)
+            files.append(FileEntry(rel, len(data), mode, sha))
+        return Manifest(resolved.name, _manifest_digest(files), files)
+
+    @timed("materialize.manifest")
+    def build_manifest(self, name: str, machines_dir: Path = MACHINES_DIR) -> Manifest:
+        """Return the manifest for template ``name``, hashing only if it changed.
+
+        Templates that declare a ``base`` are resolved through
+        :class:`tools.layers.Resolver` first.
+        """
+        root = template_dir(name, machines_dir)
+        if read_base(root) is not None:
+            resolver = self._resolvers.get(machines_dir)
+            if resolver is None:
+                resolver = self._resolvers[machines_dir] = Resolver(machines_dir, self.root / "layers")
+            signature = [["@chain", resolver.chain_key(name)]]
+            manifest = self._cached_manifest(name, signature)
+            if manifest is None:
+                manifest = self.resolved_manifest(resolver.resolve(name))
+                self._save_manifest(manifest, signature)
+            return manifest
+
+        listing = []
+        for rel, entry in iter_template_files(root):
+            st = entry.stat()
+            listing.append((rel, entry.path, st))
+        signature = [[rel, st.st_size, st.st_mtime_ns, st.st_mode] for rel, _, st in listing]
+        manifest = self._cached_manifest(name, signature)
+        if manifest is not None:
+            return manifest
+
+        files = []
+        for rel, path, st in listing:
+            sha = hash_file(path)
+            self._ingest(path, sha)
+            files.append(FileEntry(rel, st.st_size, stat.S_IMODE(st.st_mode), sha))
+        manifest = Manifest(name, _manifest_digest(files), files)
+        self._save_manifest(manifest, signature)
+        return manifest
+
+    def _cached_manifest(self, name: str, signature: list) -> Manifest | None:
+        try:
+            cached = json.loads(self._manifest_path(name).read_text())
+            if cached.get("signature") == signature:
+                manifest = Manifest.from_json(cached["manifest"])
+                if all(self.object_path(f.sha256).exists() for f in manifest.files):
+                    return manifest
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    def _save_manifest(self, manifest: Manifest, signature: list) -> None:
+        cache_path = self._manifest_path(manifest.template)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = cache_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"signature": signature, "manifest": manifest.to_json()}))
+        os.replace(tmp, cache_path)
+
+
+def _reflink(src: Path, dest: Path) -> None:
+    import fcntl
+
+    with open(src, "rb") as s, open(dest, "wb") as d:
+        fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+
+
+class Materializer:
+    """Places manifest blobs into workspace directories.
+
+    A strategy that fails because the filesystem does not support it
+    (``EXDEV``, ``EOPNOTSUPP`` and the like) is disabled for the remaining
+    files, so an unsupported filesystem costs one failed syscall per process
+    rather than one per file. Any other error only falls through to the next
+    strategy for that one file.
+    """
+
+    def __init__(self, store: ObjectStore, allow_hardlink: bool = False):
+        self.store = store
+        self.strategies = [
+            s for s in STRATEGIES if s != "hardlink" or allow_hardlink
+        ]
+        if sys.platform != "linux":
+            self.strategies.remove("reflink")
+
+    def _place(self, sha256: str, dest: Path, mode: int) -> str:
+        src = self.store.object_path(sha256)
+        for strategy in list(self.strategies):
+            try:
+                if strategy == "reflink":
+                    _reflink(src, dest)
+                elif strategy == "hardlink":
+                    os.link(self.store.link_path(sha256, mode), dest)
+                    return strategy
+                else:
+                    shutil.copyfile(src, dest)
+            except OSError as exc:
+                if strategy == "copy":
+                    raise
+                try:
+                    dest.unlink()
+                except FileNotFoundError:
+                    pass
+                if exc.errno in _UNSUPPORTED:
+                    try:
+                        self.strategies.remove(strategy)
+                    except ValueError:  # another thread got there first
+                        pass
+                continue
+            os.chmod(dest, mode)
+            return strategy
+        raise RuntimeError("no materialization strategy available")
+
+    @timed("materialize.workspace")
+    def materialize(self, manifest: Manifest, destination: str | os.PathLike) -> Result:
+        dest_root = Path(destination)
+        start = time.perf_counter()
+        counts: dict[str, int] = {}
+        try:
+            made = set()
+            for f in manifest.files:
+                dest = dest_root.joinpath(*f.path.split("/"))
+                parent = dest.parent
+                if parent not in made:
+                    parent.mkdir(parents=True, exist_ok=True)
+                    made.add(parent)
+                if dest.exists():
+                    dest.unlink()
+                used = self._place(f.sha256, dest, f.mode)
+                counts[used] = counts.get(used, 0) + 1
+        except OSError as exc:
+            return Result(dest_root, (time.perf_counter() - start) * 1000,
+                          sum(counts.values()), counts, str(exc))
+        return Result(dest_root, (time.perf_counter() - start) * 1000,
+                      len(manifest.files), counts)
+
+
+@timed("materialize.provision")
+def provision(
+    template: str,
+    destinations: list[str | os.PathLike],
+    *,
+    store: ObjectStore | None = None,
+    machines_dir: Path = MACHINES_DIR,
+    allow_hardlink: bool = False,
+    workers: int = 1,
+) -> list[Result]:
+    """Materialize ``template`` into every path in ``destinations``.
+
+    Returns one :class:`Result` per destination, in input order. Failures are
+    reported in ``Result.error`` instead of aborting the batch.
+    """
+    store = store or ObjectStore()
+    manifest = store.build_manifest(template, machines_dir)
+    materializer = Materializer(store, allow_hardlink=allow_hardlink)
+    if workers <= 1:
+        return [materializer.materialize(manifest, d) for d in destinations]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda d: materializer.materialize(manifest, d), destinations))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tools.materialize", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--store", type=Path, default=DEFAULT_STORE, help="object store directory")
+    parser.add_argument("--machines", type=Path, default=MACHINES_DIR, help="templates directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_manifest = sub.add_parser("manifest", help="build and print a template manifest")
+    p_manifest.add_argument("template", nargs="?", default=DEFAULT_TEMPLATE)
+
+    p_prov = sub.add_parser("provision", help="materialize a template into workspaces")
+    p_prov.add_argument("template")
+    p_prov.add_argument("destinations", nargs="+")
+    p_prov.add_argument("--hardlink", action="store_true", help="allow hardlinks into the store")
+    p_prov.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    store = ObjectStore(args.store)
+    if args.command == "manifest":
+        manifest = store.build_manifest(args.template, args.machines)
+        json.dump(manifest.to_json(), sys.stdout, indent=2)
+        print()
+        return 0
+
+    results = provision(
+        args.template, args.destinations, store=store, machines_dir=args.machines,
+        allow_hardlink=args.hardlink, workers=args.workers,
+    )
+    failed = 0
+    for r in results:
+        print(json.dumps({
+            "destination": str(r.destination),
+            "latency_ms": round(r.latency_ms, 3),
+            "files": r.files,
+            "strategies": r.strategies,
+            "error": r.error,
+        }))
+        failed += r.error is not None
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,431 @@
+"""On-demand, pooled launcher for the stdio MCP servers in ``.mcp.json``.
+
+Nothing is started when a session opens. The first tool call to a server
+spawns it (or takes a pre-spawned instance), performs the MCP
+``initialize`` handshake and keeps the process in a :class:`ServerPool`.
+Later sessions of the same template reuse the warm instance; requests are
+multiplexed over one stdio pipe by JSON-RPC id.
+
+The pool is bounded by ``max_servers``. Instances idle for longer than
+``idle_ttl`` seconds are reaped, and when the pool is full the least
+recently used idle instance is evicted to make room. :class:`Metrics`
+records spawn latency and hit rate.
+
+Only ``command``-style (stdio) servers are launched; URL-based entries are
+reported as unsupported.
+
+Usage::
+
+    python -m tools.mcp_pool servers alignment-research-assistant
+    python -m tools.mcp_pool call <machine> <server> <tool> '{"arg": 1}'
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from tools.layers import Resolver, read_base
+from tools.registry import MACHINES_DIR, template_dir
+from tools.timing import timed
+
+PROTOCOL_VERSION = "2024-11-05"
+CLIENT_INFO = {"name": "loving-grace-mcp-pool", "version": "1"}
+
+
+class MCPError(Exception):
+    """Raised when a server cannot be started or returns a JSON-RPC error."""
+
+
+@dataclass(frozen=True)
+class ServerSpec:
+    name: str
+    command: str
+    args: tuple[str, ...] = ()
+    env: tuple[tuple[str, str], ...] = ()
+    cwd: str | None = None
+
+    @classmethod
+    def from_config(cls, name: str, config: dict) -> "ServerSpec":
+        if "command" not in config:
+            raise MCPError(f"{name}: only stdio (command) servers are supported")
+        env = config.get("env") or {}
+        return cls(
+            name,
+            config["command"],
+            tuple(config.get("args", ())),
+            tuple(sorted((k, str(v)) for k, v in env.items())),
+            config.get("cwd"),
+        )
+
+    @property
+    def key(self) -> str:
+        raw = json.dumps([self.command, self.args, self.env, self.cwd])
+        return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+@timed("mcp.config")
+def load_servers(template: str, machines_dir: Path = MACHINES_DIR) -> dict[str, dict]:
+    """Return the ``mcpServers`` map for ``template``, resolving any base."""
+    root = template_dir(template, machines_dir)
+    if read_base(root) is not None:
+        files = Resolver(machines_dir).resolve(template).files
+        raw = files.get(".mcp.json", (0, b"{}"))[1]
+    else:
+        try:
+            raw = (root / ".mcp.json").read_bytes()
+        except FileNotFoundError:
+            raw = b"{}"
+    return json.loads(raw).get("mcpServers") or {}
+
+
+class StdioServer:
+    """One MCP server process speaking newline-delimited JSON-RPC."""
+
+    def __init__(self, spec: ServerSpec):
+        self.spec = spec
+        env = dict(os.environ)
+        env.update({k: os.path.expandvars(v) for k, v in spec.env})
+        try:
+            self.proc = subprocess.Popen(
+                [spec.command, *spec.args],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                env=env,
+                cwd=spec.cwd,
+            )
+        except OSError as exc:
+            raise MCPError(f"{spec.name}: cannot start {spec.command!r}: {exc}") from exc
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._pending: dict[int, Future] = {}
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+        self.in_use = 0
+        self.last_used = time.monotonic()
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def _read_loop(self) -> None:
+        for line in self.proc.stdout:
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                continue
+            # Batches and other non-object lines carry no reply we wait for.
+            if not isinstance(msg, dict):
+                continue
+            future = self._pending.pop(msg.get("id"), None)
+            if future is None:
+                continue
+            if "error" in msg:
+                error = msg["error"]
+                message = error.get("message") if isinstance(error, dict) else error
+                future.set_exception(MCPError(f"{self.spec.name}: {message}"))
+            else:
+                future.set_result(msg.get("result"))
+        for future in list(self._pending.values()):
+            future.set_exception(MCPError(f"{self.spec.name}: server exited"))
+        self._pending.clear()
+
+    def _send(self, msg: dict) -> None:
+        data = (json.dumps(msg) + "\n").encode()
+        with self._lock:
+            try:
+                self.proc.stdin.write(data)
+                self.proc.stdin.flush()
+            except OSError as exc:
+                raise MCPError(f"{self.spec.name}: server exited") from exc
+
+    def request(self, method: str, params: dict | None = None, timeout: float | None = 30.0):
+        future: Future = Future()
+        with self._lock:
+            self._next_id += 1
+            msg_id = self._next_id
+            self._pending[msg_id] = future
+        self._send({"jsonrpc": "2.0", "id": msg_id, "method": method, "params": params or {}})
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            self._pending.pop(msg_id, None)
+            raise MCPError(f"{self.spec.name}: {method} timed out") from None
+
+    def notify(self, method: str, params: dict | None = None) -> None:
+        self._send({"jsonrpc": "2.0", "method": method, "params": params or {}})
+
+    def initialize(self, timeout: float | None = 30.0) -> dict:
+        result = self.request("initialize", {
+            "protocolVersion": PROTOCOL_VERSION,
+            "capabilities": {},
+            "clientInfo": CLIENT_INFO,
+        }, timeout)
+        self.notify("notifications/initialized")
+        return result
+
+    def close(self, timeout: float = 2.0) -> None:
+        if self.proc.stdin and not self.proc.stdin.closed:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+        try:
+            self.proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+
+@dataclass
+class Metrics:
+    spawns: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    spawn_latency_ms: list[float] = field(default_factory=list)
+
+    def snapshot(self) -> dict:
+        lat = sorted(self.spawn_latency_ms)
+        lookups = self.hits + self.misses
+
+        def pct(p: float) -> float | None:
+            return round(lat[min(len(lat) - 1, int(p * len(lat)))], 3) if lat else None
+
+        return {
+            "spawns": self.spawns,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "spawn_ms_p50": pct(0.50),
+            "spawn_ms_p95": pct(0.95),
+        }
+
+
+class ServerPool:
+    """Bounded pool of warm MCP servers shared across sessions.
+
+    Instances are keyed by ``(template, spec.key)``: sessions of the same
+    template share servers (and any state they hold), different templates
+    never do.
+    """
+
+    def __init__(self, max_servers: int = 16, idle_ttl: float = 300.0, startup_timeout: float = 30.0):
+        self.max_servers = max_servers
+        self.idle_ttl = idle_ttl
+        self.startup_timeout = startup_timeout
+        self.metrics = Metrics()
+        self._servers: OrderedDict[tuple[str, str], StdioServer] = OrderedDict()
+        self._lock = threading.Lock()
+        self._starting: dict[tuple[str, str], threading.Event] = {}
+
+    @timed("mcp.spawn")
+    def _spawn(self, spec: ServerSpec) -> StdioServer:
+        server = StdioServer(spec)
+        try:
+            server.initialize(self.startup_timeout)
+        except MCPError:
+            server.close()
+            raise
+        return server
+
+    def _evict(self, key: tuple[str, str]) -> StdioServer:
+        """Drop ``key`` from the pool; the caller closes it once the lock is released."""
+        self.metrics.evictions += 1
+        return self._servers.pop(key)
+
+    @staticmethod
+    def _close_all(servers: list[StdioServer]) -> None:
+        # Closing waits for the process to exit, so it never runs under the
+        # pool lock, where it would stall every other session's acquire.
+        for server in servers:
+            server.close()
+
+    def reap(self) -> int:
+        """Close instances idle for longer than ``idle_ttl``. Returns the count."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [
+                self._evict(k) for k, s in list(self._servers.items())
+                if not s.alive or (s.in_use == 0 and now - s.last_used > self.idle_ttl)
+            ]
+        self._close_all(expired)
+        return len(expired)
+
+    def _full(self) -> bool:
+        # Spawns in flight hold a slot too, or concurrent misses overshoot the bound.
+        return len(self._servers) + len(self._starting) >= self.max_servers
+
+    def _make_room(self) -> list[StdioServer]:
+        """Evict idle servers until a spawn fits, or none are left. Returns them for closing."""
+        evicted = []
+        while self._full():
+            idle = next((k for k, s in self._servers.items() if s.in_use == 0), None)
+            if idle is None:
+                break
+            evicted.append(self._evict(idle))
+        return evicted
+
+    def prespawn(self, template: str, specs) -> None:
+        """Start ``specs`` for ``template`` ahead of the first tool call."""
+        for spec in specs:
+            self.release(self.acquire(template, spec, count=False))
+
+    def acquire(self, template: str, spec: ServerSpec, count: bool = True) -> StdioServer:
+        key = (template, spec.key)
+        self.reap()
+        while True:
+            stale = []
+            with self._lock:
+                server = self._servers.get(key)
+                if server is not None and server.alive:
+                    self._servers.move_to_end(key)
+                    server.in_use += 1
+                    if count:
+                        self.metrics.hits += 1
+                    return server
+                if server is not None:
+                    stale.append(self._servers.pop(key))  # already exited; close() reaps it
+                pending = self._starting.get(key)
+                if pending is None:
+                    stale += self._make_room()
+                    full = self._full()
+                    if not full:
+                        self._starting[key] = threading.Event()
+            self._close_all(stale)
+            if pending is None:
+                if full:
+                    raise MCPError(f"pool exhausted: {self.max_servers} servers busy")
+                break
+            pending.wait()  # another session is spawning this server
+
+        start = time.perf_counter()
+        try:
+            server = self._spawn(spec)
+        except BaseException:
+            with self._lock:
+                self._starting.pop(key).set()
+            raise
+        latency = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._starting.pop(key).set()
+            self._servers[key] = server
+            server.in_use += 1
+            self.metrics.spawns += 1
+            self.metrics.spawn_latency_ms.append(latency)
+            if count:
+                self.metrics.misses += 1
+        return server
+
+    def release(self, server: StdioServer) -> None:
+        with self._lock:
+            server.in_use -= 1
+            server.last_used = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            servers = [self._evict(key) for key in list(self._servers)]
+        self._close_all(servers)
+
+
+class Session:
+    """A conversation's view of its template's MCP servers.
+
+    Servers are acquired from the pool on first use and held until
+    :meth:`close`.
+    """
+
+    def __init__(self, pool: ServerPool, template: str, servers: dict[str, dict]):
+        self.pool = pool
+        self.template = template
+        self.config = servers
+        self._held: dict[str, StdioServer] = {}
+
+    @classmethod
+    def for_template(cls, pool: ServerPool, template: str, machines_dir: Path = MACHINES_DIR) -> "Session":
+        return cls(pool, template, load_servers(template, machines_dir))
+
+    def specs(self) -> list[ServerSpec]:
+        return [ServerSpec.from_config(n, c) for n, c in self.config.items() if "command" in c]
+
+    def _server(self, name: str) -> StdioServer:
+        server = self._held.get(name)
+        if server is not None and server.alive:
+            return server
+        if name not in self.config:
+            raise MCPError(f"{self.template}: no MCP server named {name!r}")
+        server = self.pool.acquire(self.template, ServerSpec.from_config(name, self.config[name]))
+        self._held[name] = server
+        return server
+
+    def list_tools(self, server: str) -> list[dict]:
+        return self._server(server).request("tools/list")["tools"]
+
+    def call_tool(self, server: str, tool: str, arguments: dict | None = None, timeout: float | None = 60.0):
+        return self._server(server).request("tools/call", {"name": tool, "arguments": arguments or {}}, timeout)
+
+    def close(self) -> None:
+        for server in self._held.values():
+            self.pool.release(server)
+        self._held.clear()
+
+    def __enter__(self) -> "Session":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tools.mcp_pool", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--machines", type=Path, default=MACHINES_DIR, help="templates directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("servers", help="list a template's MCP servers").add_argument("template")
+    p_call = sub.add_parser("call", help="call one tool and print pool metrics")
+    p_call.add_argument("template")
+    p_call.add_argument("server")
+    p_call.add_argument("tool")
+    p_call.add_argument("arguments", nargs="?", default="{}", help="JSON object")
+    p_call.add_argument("--repeat", type=int, default=1, help="sessions to run against the same pool")
+    args = parser.parse_args(argv)
+
+    try:
+        servers = load_servers(args.template, args.machines)
+    except (KeyError, ValueError) as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    if args.command == "servers":
+        for name, config in servers.items():
+            kind = "stdio" if "command" in config else "unsupported"
+            print(f"{name}\t{kind}")
+        return 0
+
+    pool = ServerPool()
+    try:
+        for _ in range(args.repeat):
+            with Session(pool, args.template, servers) as session:
+                result = session.call_tool(args.server, args.tool, json.loads(args.arguments))
+        print(json.dumps(result))
+        print(json.dumps(pool.metrics.snapshot()), file=sys.stderr)
+    except MCPError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    finally:
+        pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
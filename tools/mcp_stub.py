@@ -0,0 +1,90 @@
+"""Minimal stdio MCP server for exercising :mod:`tools.mcp_pool` offline.
+
+Speaks newline-delimited JSON-RPC 2.0 and implements ``initialize``,
+``tools/list`` and ``tools/call`` for three tools:
+
+``echo``   returns its ``text`` argument
+``sleep``  waits ``seconds`` then returns
+``pid``    returns the server's process id (to observe pooling)
+
+Point a ``.mcp.json`` entry at it::
+
+    {"mcpServers": {"stub": {"command": "python", "args": ["-m", "tools.mcp_stub"]}}}
+
+``--startup-delay`` simulates a slow-starting server.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+
+PROTOCOL_VERSION = "2024-11-05"
+
+TOOLS = [
+    {"name": "echo", "description": "Echo text back.",
+     "inputSchema": {"type": "object", "properties": {"text": {"type": "string"}}}},
+    {"name": "sleep", "description": "Sleep for a number of seconds.",
+     "inputSchema": {"type": "object", "properties": {"seconds": {"type": "number"}}}},
+    {"name": "pid", "description": "Return the server process id.",
+     "inputSchema": {"type": "object", "properties": {}}},
+]
+
+
+def _text(value) -> dict:
+    return {"content": [{"type": "text", "text": str(value)}]}
+
+
+def handle(method: str, params: dict):
+    if method == "initialize":
+        return {
+            "protocolVersion": PROTOCOL_VERSION,
+            "capabilities": {"tools": {}},
+            "serverInfo": {"name": "loving-grace-stub", "version": "1"},
+        }
+    if method == "tools/list":
+        return {"tools": TOOLS}
+    if method == "tools/call":
+        name, args = params.get("name"), params.get("arguments") or {}
+        if name == "echo":
+            return _text(args.get("text", ""))
+        if name == "sleep":
+            time.sleep(float(args.get("seconds", 0)))
+            return _text("ok")
+        if name == "pid":
+            return _text(os.getpid())
+        raise KeyError(f"unknown tool: {name}")
+    if method == "ping":
+        return {}
+    raise NotImplementedError(method)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tools.mcp_stub", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--startup-delay", type=float, default=0.0, help="seconds to wait before serving")
+    args = parser.parse_args(argv)
+    time.sleep(args.startup_delay)
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        msg = json.loads(line)
+        if "id" not in msg:  # notification
+            continue
+        reply = {"jsonrpc": "2.0", "id": msg["id"]}
+        try:
+            reply["result"] = handle(msg.get("method", ""), msg.get("params") or {})
+        except NotImplementedError as exc:
+            reply["error"] = {"code": -32601, "message": f"method not found: {exc}"}
+        except Exception as exc:  # report, keep serving
+            reply["error"] = {"code": -32602, "message": str(exc)}
+        sys.stdout.write(json.dumps(reply) + "\n")
+        sys.stdout.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,649 @@
+"""Indexed knowledge-graph memory backend for MCP.
+
+A drop-in replacement for the reference ``server-memory`` MCP server (same
+tool names and arguments) that keeps the graph in SQLite instead of one flat
+JSONL file:
+
+* entities, observations and relations are rows with unique constraints,
+  so writes are incremental upserts instead of rewriting the whole file;
+* observations and entity names/types are indexed with an FTS5 trigram
+  index, so ``search_nodes`` keeps the reference's case-insensitive
+  substring semantics without scanning (queries shorter than three
+  characters, and SQLite builds without FTS5 trigrams, fall back to a
+  ``LIKE`` scan, which folds case for ASCII only);
+* relations are indexed in both directions for neighbourhood traversal;
+* the database runs in WAL mode, so each write batch is appended to the log
+  rather than rewriting pages in place.
+
+This module deliberately depends on nothing else in ``tools`` so it can be
+copied into a workspace next to the template's ``.mcp.json``::
+
+    {"mcpServers": {"memory": {
+        "command": "python", "args": ["memory_store.py", "serve"],
+        "env": {"MEMORY_DB_PATH": "/home/user/workspace/.memory/memory.db"}}}}
+
+Usage::
+
+    python -m tools.memory_store import memory.json --db memory.db
+    python -m tools.memory_store export --db memory.db > memory.json
+    python -m tools.memory_store bench --sizes 1000 100000 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+DEFAULT_DB = "memory.db"
+PROTOCOL_VERSION = "2024-11-05"
+BATCH_SIZE = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    entity_type TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY,
+    entity_id INTEGER NOT NULL REFERENCES entities(id) ON DELETE CASCADE,
+    content TEXT NOT NULL,
+    UNIQUE (entity_id, content)
+);
+CREATE TABLE IF NOT EXISTS relations (
+    from_id INTEGER NOT NULL REFERENCES entities(id) ON DELETE CASCADE,
+    to_id INTEGER NOT NULL REFERENCES entities(id) ON DELETE CASCADE,
+    relation_type TEXT NOT NULL,
+    PRIMARY KEY (from_id, to_id, relation_type)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS relations_to ON relations (to_id, from_id);
+"""
+
+# Bumped when the FTS tables change; older databases are reindexed on open.
+FTS_VERSION = 2
+
+_FTS_DROP = """
+DROP TRIGGER IF EXISTS entities_ai;
+DROP TRIGGER IF EXISTS entities_ad;
+DROP TRIGGER IF EXISTS observations_ai;
+DROP TRIGGER IF EXISTS observations_ad;
+DROP TABLE IF EXISTS entities_fts;
+DROP TABLE IF EXISTS observations_fts;
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS entities_fts USING fts5(
+    name, entity_type, content='entities', content_rowid='id', tokenize='trigram');
+CREATE VIRTUAL TABLE IF NOT EXISTS observations_fts USING fts5(
+    content, content='observations', content_rowid='id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS entities_ai AFTER INSERT ON entities BEGIN
+    INSERT INTO entities_fts(rowid, name, entity_type) VALUES (new.id, new.name, new.entity_type);
+END;
+CREATE TRIGGER IF NOT EXISTS entities_ad AFTER DELETE ON entities BEGIN
+    INSERT INTO entities_fts(entities_fts, rowid, name, entity_type)
+    VALUES ('delete', old.id, old.name, old.entity_type);
+END;
+CREATE TRIGGER IF NOT EXISTS observations_ai AFTER INSERT ON observations BEGIN
+    INSERT INTO observations_fts(rowid, content) VALUES (new.id, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS observations_ad AFTER DELETE ON observations BEGIN
+    INSERT INTO observations_fts(observations_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+"""
+
+
+
+class MemoryStore:
+    """Knowledge graph stored in SQLite.
+
+    Every mutating method runs as one transaction, so a batch of entities or
+    observations costs one fsync regardless of its size.
+    """
+
+    def __init__(self, path: str | os.PathLike = DEFAULT_DB):
+        self.path = os.fspath(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(_SCHEMA)
+        try:
+            self._init_fts()
+            self.fts = True
+        except sqlite3.OperationalError:  # SQLite built without FTS5 or its trigram tokenizer
+            self.fts = False
+
+    def _init_fts(self) -> None:
+        if self.db.execute("PRAGMA user_version").fetchone()[0] == FTS_VERSION:
+            self.db.executescript(_FTS_SCHEMA)
+            return
+        # executescript commits any open transaction, so the script carries its own.
+        try:
+            self.db.executescript(
+                "BEGIN IMMEDIATE;" + _FTS_DROP + _FTS_SCHEMA
+                + "INSERT INTO entities_fts(entities_fts) VALUES ('rebuild');"
+                + "INSERT INTO observations_fts(observations_fts) VALUES ('rebuild');"
+                + f"PRAGMA user_version = {FTS_VERSION}; COMMIT;"
+            )
+        except sqlite3.OperationalError:
+            if self.db.in_transaction:
+                self.db.execute("ROLLBACK")
+            raise
+
+    def close(self) -> None:
+        self.db.close()
+
+    def _tx(self):
+        return _Transaction(self.db)
+
+    def _ids(self, names) -> dict[str, int]:
+        ids = {}
+        names = list(dict.fromkeys(names))
+        for i in range(0, len(names), 500):
+            chunk = names[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            ids.update(self.db.execute(f"SELECT name, id FROM entities WHERE name IN ({marks})", chunk))
+        return ids
+
+    # -- writes --------------------------------------------------------
+
+    def create_entities(self, entities: list[dict]) -> list[dict]:
+        """Insert new entities with their observations; existing names are skipped."""
+        created = []
+        with self._tx():
+            for e in entities:
+                cur = self.db.execute(
+                    "INSERT INTO entities (name, entity_type) VALUES (?, ?) ON CONFLICT (name) DO NOTHING",
+                    (e["name"], e.get("entityType", "")),
+                )
+                if cur.rowcount:
+                    self.db.executemany(
+                        "INSERT OR IGNORE INTO observations (entity_id, content) VALUES (?, ?)",
+                        [(cur.lastrowid, o) for o in e.get("observations", [])],
+                    )
+                    created.append(e)
+        return created
+
+    def create_relations(self, relations: list[dict]) -> list[dict]:
+        created = []
+        with self._tx():
+            ids = self._ids([r["from"] for r in relations] + [r["to"] for r in relations])
+            for r in relations:
+                if r["from"] not in ids or r["to"] not in ids:
+                    continue
+                cur = self.db.execute(
+                    "INSERT OR IGNORE INTO relations (from_id, to_id, relation_type) VALUES (?, ?, ?)",
+                    (ids[r["from"]], ids[r["to"]], r["relationType"]),
+                )
+                if cur.rowcount:
+                    created.append(r)
+        return created
+
+    def add_observations(self, observations: list[dict]) -> list[dict]:
+        results = []
+        with self._tx():
+            ids = self._ids(o["entityName"] for o in observations)
+            for o in observations:
+                if o["entityName"] not in ids:
+                    raise KeyError(f"Entity with name {o['entityName']} not found")
+                added = []
+                for content in o.get("contents", []):
+                    cur = self.db.execute(
+                        "INSERT OR IGNORE INTO observations (entity_id, content) VALUES (?, ?)",
+                        (ids[o["entityName"]], content),
+                    )
+                    if cur.rowcount:
+                        added.append(content)
+                results.append({"entityName": o["entityName"], "addedObservations": added})
+        return results
+
+    def upsert(self, entities=(), relations=()) -> None:
+        """Bulk-merge entities (adding observations to existing ones) and relations."""
+        with self._tx():
+            self.db.executemany(
+                "INSERT INTO entities (name, entity_type) VALUES (?, ?) ON CONFLICT (name) DO NOTHING",
+                [(e["name"], e.get("entityType", "")) for e in entities],
+            )
+            ids = self._ids(
+                [e["name"] for e in entities]
+                + [r["from"] for r in relations] + [r["to"] for r in relations]
+            )
+            self.db.executemany(
+                "INSERT OR IGNORE INTO observations (entity_id, content) VALUES (?, ?)",
+                [(ids[e["name"]], o) for e in entities for o in e.get("observations", [])],
+            )
+            self.db.executemany(
+                "INSERT OR IGNORE INTO relations (from_id, to_id, relation_type) VALUES (?, ?, ?)",
+                [
+                    (ids[r["from"]], ids[r["to"]], r["relationType"])
+                    for r in relations if r["from"] in ids and r["to"] in ids
+                ],
+            )
+
+    def delete_entities(self, names: list[str]) -> None:
+        with self._tx():
+            self.db.executemany("DELETE FROM entities WHERE name = ?", [(n,) for n in names])
+
+    def delete_observations(self, deletions: list[dict]) -> None:
+        with self._tx():
+            ids = self._ids(d["entityName"] for d in deletions)
+            self.db.executemany(
+                "DELETE FROM observations WHERE entity_id = ? AND content = ?",
+                [
+                    (ids[d["entityName"]], o)
+                    for d in deletions if d["entityName"] in ids
+                    for o in d.get("observations", [])
+                ],
+            )
+
+    def delete_relations(self, relations: list[dict]) -> None:
+        with self._tx():
+            ids = self._ids([r["from"] for r in relations] + [r["to"] for r in relations])
+            self.db.executemany(
+                "DELETE FROM relations WHERE from_id = ? AND to_id = ? AND relation_type = ?",
+                [
+                    (ids[r["from"]], ids[r["to"]], r["relationType"])
+                    for r in relations if r["from"] in ids and r["to"] in ids
+                ],
+            )
+
+    # -- reads ---------------------------------------------------------
+
+    def _graph(self, entity_ids: list[int]) -> dict:
+        """Return entities ``entity_ids`` and the relations among them.
+
+        The selection goes into a temp table that drives every join (``CROSS
+        JOIN`` pins the loop order), so cost depends on the selection size,
+        not on the size of the graph.
+        """
+        if not entity_ids:
+            return {"entities": [], "relations": []}
+        self.db.execute("CREATE TEMP TABLE IF NOT EXISTS _sel (id INTEGER PRIMARY KEY)")
+        self.db.execute("DELETE FROM _sel")
+        self.db.executemany("INSERT OR IGNORE INTO _sel VALUES (?)", [(i,) for i in entity_ids])
+        entities = {}
+        for eid, name, etype in self.db.execute(
+            "SELECT e.id, e.name, e.entity_type FROM _sel s CROSS JOIN entities e ON e.id = s.id"
+        ):
+            entities[eid] = {"type": "entity", "name": name, "entityType": etype, "observations": []}
+        for eid, content in self.db.execute(
+            "SELECT o.entity_id, o.content FROM _sel s CROSS JOIN observations o ON o.entity_id = s.id "
+            "ORDER BY o.id"
+        ):
+            entities[eid]["observations"].append(content)
+        relations = [
+            {"type": "relation", "from": f, "to": t, "relationType": rt}
+            for f, t, rt in self.db.execute(
+                "SELECT a.name, b.name, r.relation_type FROM _sel sf "
+                "CROSS JOIN relations r ON r.from_id = sf.id "
+                "CROSS JOIN entities a ON a.id = r.from_id CROSS JOIN entities b ON b.id = r.to_id "
+                "WHERE r.to_id IN (SELECT id FROM _sel)"
+            )
+        ]
+        return {"entities": list(entities.values()), "relations": relations}
+
+    def search_ids(self, query: str, limit: int | None = None) -> list[int]:
+        """Return ids of entities whose name, type or an observation contains ``query``.
+
+        Matching is a case-insensitive substring test, as in ``server-memory``.
+        """
+        if self.fts and len(query) >= 3:
+            match = '"' + query.replace('"', '""') + '"'
+            sql = (
+                "SELECT rowid FROM entities_fts WHERE entities_fts MATCH ?1 "
+                "UNION SELECT o.entity_id FROM observations_fts f "
+                "JOIN observations o ON o.id = f.rowid WHERE observations_fts MATCH ?1"
+            )
+            args: tuple = (match,)
+        else:
+            like = "%" + re.sub(r"([\\%_])", r"\\\1", query) + "%"
+            sql = (
+                "SELECT id FROM entities WHERE name LIKE ?1 ESCAPE '\\' OR entity_type LIKE ?1 ESCAPE '\\' "
+                "UNION SELECT entity_id FROM observations WHERE content LIKE ?1 ESCAPE '\\'"
+            )
+            args = (like,)
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [row[0] for row in self.db.execute(sql, args)]
+
+    def search_nodes(self, query: str, limit: int | None = None) -> dict:
+        return self._graph(self.search_ids(query, limit))
+
+    def open_nodes(self, names: list[str]) -> dict:
+        return self._graph(list(self._ids(names).values()))
+
+    def neighbours(self, name: str, depth: int = 1) -> dict:
+        """Return the subgraph within ``depth`` hops of ``name``, in either direction."""
+        ids = self._ids([name])
+        if not ids:
+            return {"entities": [], "relations": []}
+        rows = self.db.execute(
+            """
+            WITH RECURSIVE reach(id, d) AS (
+                SELECT ?1, 0
+                UNION
+                SELECT r.to_id, reach.d + 1
+                FROM reach CROSS JOIN relations r ON r.from_id = reach.id WHERE reach.d < ?2
+                UNION
+                SELECT r.from_id, reach.d + 1
+                FROM reach CROSS JOIN relations r ON r.to_id = reach.id WHERE reach.d < ?2
+            )
+            SELECT DISTINCT id FROM reach
+            """,
+            (ids[name], depth),
+        )
+        return self._graph([r[0] for r in rows])
+
+    def read_graph(self) -> dict:
+        graph: dict[str, list] = {"entities": [], "relations": []}
+        for record in self.iter_records():
+            graph[f"{record['type']}s"].append(record)
+        return graph
+
+    def iter_records(self):
+        """Yield the graph as ``server-memory`` JSONL records, in bounded memory."""
+        cur = self.db.execute(
+            "SELECT e.id, e.name, e.entity_type, o.content FROM entities e "
+            "LEFT JOIN observations o ON o.entity_id = e.id ORDER BY e.id, o.id"
+        )
+        current = None
+        for eid, name, etype, content in cur:
+            if current is None or current[0] != eid:
+                if current is not None:
+                    yield current[1]
+                current = (eid, {"type": "entity", "name": name, "entityType": etype, "observations": []})
+            if content is not None:
+                current[1]["observations"].append(content)
+        if current is not None:
+            yield current[1]
+        for f, t, rt in self.db.execute(
+            "SELECT a.name, b.name, r.relation_type FROM relations r "
+            "JOIN entities a ON a.id = r.from_id JOIN entities b ON b.id = r.to_id"
+        ):
+            yield {"type": "relation", "from": f, "to": t, "relationType": rt}
+
+    def stats(self) -> dict:
+        (entities,) = self.db.execute("SELECT count(*) FROM entities").fetchone()
+        (observations,) = self.db.execute("SELECT count(*) FROM observations").fetchone()
+        (relations,) = self.db.execute("SELECT count(*) FROM relations").fetchone()
+        return {"entities": entities, "observations": observations, "relations": relations}
+
+
+class _Transaction:
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, *_):
+        self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+# -- import / export ---------------------------------------------------
+
+def import_jsonl(store: MemoryStore, lines, batch_size: int = BATCH_SIZE) -> dict:
+    """Load ``server-memory`` JSONL records into ``store`` in batches.
+
+    Relations are buffered until all entities are in, since a relation may
+    precede the entities it connects.
+    """
+    entities: list[dict] = []
+    relations: list[dict] = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if record.get("type") == "entity":
+            entities.append(record)
+            if len(entities) >= batch_size:
+                store.upsert(entities=entities)
+                entities = []
+        elif record.get("type") == "relation":
+            relations.append(record)
+    store.upsert(entities=entities)
+    for i in range(0, len(relations), batch_size):
+        store.upsert(relations=relations[i:i + batch_size])
+    return store.stats()
+
+
+def export_jsonl(store: MemoryStore, out) -> int:
+    count = 0
+    for record in store.iter_records():
+        out.write(json.dumps(record) + "\n")
+        count += 1
+    return count
+
+
+# -- MCP server --------------------------------------------------------
+
+def _schema(properties: dict, required: list[str]) -> dict:
+    return {"type": "object", "properties": properties, "required": required}
+
+
+_ENTITY = {"type": "object", "properties": {
+    "name": {"type": "string"}, "entityType": {"type": "string"},
+    "observations": {"type": "array", "items": {"type": "string"}}}}
+_RELATION = {"type": "object", "properties": {
+    "from": {"type": "string"}, "to": {"type": "string"}, "relationType": {"type": "string"}}}
+_NAMES = {"type": "array", "items": {"type": "string"}}
+
+TOOLS = {
+    "create_entities": _schema({"entities": {"type": "array", "items": _ENTITY}}, ["entities"]),
+    "create_relations": _schema({"relations": {"type": "array", "items": _RELATION}}, ["relations"]),
+    "add_observations": _schema({"observations": {"type": "array", "items": {"type": "object", "properties": {
+        "entityName": {"type": "string"}, "contents": _NAMES}}}}, ["observations"]),
+    "delete_entities": _schema({"entityNames": _NAMES}, ["entityNames"]),
+    "delete_observations": _schema({"deletions": {"type": "array", "items": {"type": "object", "properties": {
+        "entityName": {"type": "string"}, "observations": _NAMES}}}}, ["deletions"]),
+    "delete_relations": _schema({"relations": {"type": "array", "items": _RELATION}}, ["relations"]),
+    "read_graph": _schema({}, []),
+    "search_nodes": _schema({"query": {"type": "string"}}, ["query"]),
+    "open_nodes": _schema({"names": _NAMES}, ["names"]),
+}
+
+
+def call_tool(store: MemoryStore, name: str, args: dict):
+    if name == "create_entities":
+        return store.create_entities(args["entities"])
+    if name == "create_relations":
+        return store.create_relations(args["relations"])
+    if name == "add_observations":
+        return store.add_observations(args["observations"])
+    if name == "delete_entities":
+        store.delete_entities(args["entityNames"])
+        return "Entities deleted successfully"
+    if name == "delete_observations":
+        store.delete_observations(args["deletions"])
+        return "Observations deleted successfully"
+    if name == "delete_relations":
+        store.delete_relations(args["relations"])
+        return "Relations deleted successfully"
+    if name == "read_graph":
+        return store.read_graph()
+    if name == "search_nodes":
+        return store.search_nodes(args["query"])
+    if name == "open_nodes":
+        return store.open_nodes(args["names"])
+    raise KeyError(f"Unknown tool: {name}")
+
+
+def _reply(stdout, reply: dict) -> None:
+    stdout.write(json.dumps(reply) + "\n")
+    stdout.flush()
+
+
+def serve(store: MemoryStore, stdin=sys.stdin, stdout=sys.stdout) -> None:
+    """Serve the memory tools over newline-delimited JSON-RPC on stdio.
+
+    Malformed lines get a JSON-RPC error reply and the server keeps going.
+    """
+    for line in stdin:
+        if not line.strip():
+            continue
+        try:
+            msg = json.loads(line)
+        except ValueError as exc:
+            _reply(stdout, {"jsonrpc": "2.0", "id": None, "error": {"code": -32700, "message": f"parse error: {exc}"}})
+            continue
+        if not isinstance(msg, dict) or not isinstance(msg.get("params") or {}, dict):
+            _reply(stdout, {"jsonrpc": "2.0", "id": msg.get("id") if isinstance(msg, dict) else None,
+                            "error": {"code": -32600, "message": "invalid request"}})
+            continue
+        if "id" not in msg:
+            continue
+        method, params = msg.get("method"), msg.get("params") or {}
+        reply = {"jsonrpc": "2.0", "id": msg["id"]}
+        if method == "initialize":
+            reply["result"] = {
+                "protocolVersion": PROTOCOL_VERSION,
+                "capabilities": {"tools": {}},
+                "serverInfo": {"name": "loving-grace-memory", "version": "1"},
+            }
+        elif method == "tools/list":
+            reply["result"] = {"tools": [
+                {"name": n, "description": n.replace("_", " "), "inputSchema": s} for n, s in TOOLS.items()
+            ]}
+        elif method == "tools/call":
+            try:
+                result = call_tool(store, params.get("name"), params.get("arguments") or {})
+                text = result if isinstance(result, str) else json.dumps(result, indent=2)
+                reply["result"] = {"content": [{"type": "text", "text": text}]}
+            except (KeyError, TypeError, sqlite3.Error) as exc:
+                message = exc.args[0] if isinstance(exc, KeyError) and exc.args else str(exc)
+                reply["result"] = {"content": [{"type": "text", "text": str(message)}], "isError": True}
+        elif method == "ping":
+            reply["result"] = {}
+        else:
+            reply["error"] = {"code": -32601, "message": f"method not found: {method}"}
+        _reply(stdout, reply)
+
+
+# -- benchmark ---------------------------------------------------------
+
+_WORDS = (
+    "reward hacking corrigibility oversight interpretability circuit probe steering "
+    "superposition deception forecast hypothesis citation ablation sparse autoencoder "
+    "activation patching generalization evaluation scaling elicitation threat model"
+).split()
+
+
+def _synthetic(n_obs: int, per_entity: int = 10, seed: int = 0):
+    rng = random.Random(seed)
+    for start in range(0, n_obs, per_entity):
+        yield {
+            "type": "entity",
+            "name": f"note-{start // per_entity}",
+            "entityType": rng.choice(["paper", "hypothesis", "experiment", "forecast"]),
+            "observations": [
+                " ".join(rng.choices(_WORDS, k=8)) + f" o{start + i}x"
+                for i in range(min(per_entity, n_obs - start))
+            ],
+        }
+
+
+def _synthetic_relations(n_entities: int, per_entity: int = 3, seed: int = 0):
+    rng = random.Random(seed)
+    for i in range(n_entities):
+        for _ in range(per_entity):
+            yield {
+                "type": "relation",
+                "from": f"note-{i}",
+                "to": f"note-{rng.randrange(n_entities)}",
+                "relationType": rng.choice(["cites", "supports", "contradicts"]),
+            }
+
+
+def bench(sizes: list[int], queries: int = 200) -> list[dict]:
+    """Measure search/open latency at each observation count."""
+    results = []
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            store = MemoryStore(Path(tmp) / f"bench-{n}.db")
+            start = time.perf_counter()
+            batch = []
+            for entity in _synthetic(n):
+                batch.append(entity)
+                if len(batch) * 10 >= BATCH_SIZE:
+                    store.upsert(entities=batch)
+                    batch = []
+            store.upsert(entities=batch)
+            n_entities = store.stats()["entities"]
+            relations = list(_synthetic_relations(n_entities))
+            for i in range(0, len(relations), BATCH_SIZE):
+                store.upsert(relations=relations[i:i + BATCH_SIZE])
+            load_s = time.perf_counter() - start
+
+            def timed(fn) -> float:
+                lat = []
+                for _ in range(queries):
+                    t = time.perf_counter()
+                    fn()
+                    lat.append((time.perf_counter() - t) * 1000)
+                lat.sort()
+                return round(lat[len(lat) // 2], 3)
+
+            # A unique term (the observation serial) keeps result size constant
+            # so the numbers reflect lookup cost rather than payload size.
+            results.append({
+                "observations": n,
+                "relations": len(relations),
+                "load_s": round(load_s, 2),
+                "search_ms_p50": timed(lambda: store.search_nodes(f"o{rng.randrange(n)}x")),
+                "open_ms_p50": timed(lambda: store.open_nodes([f"note-{rng.randrange(n_entities)}"])),
+                "neighbours_ms_p50": timed(lambda: store.neighbours(f"note-{rng.randrange(n_entities)}")),
+            })
+            store.close()
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tools.memory_store", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db", default=os.environ.get("MEMORY_DB_PATH", DEFAULT_DB), help="SQLite database path")
+    # ``--db`` is accepted after the subcommand too; it only overrides when given.
+    db = argparse.ArgumentParser(add_help=False)
+    db.add_argument("--db", default=argparse.SUPPRESS, help="SQLite database path")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("serve", parents=[db], help="run as a stdio MCP server")
+    sub.add_parser("import", parents=[db], help="import a server-memory JSONL file").add_argument("source", type=Path)
+    sub.add_parser("export", parents=[db], help="stream the graph as server-memory JSONL to stdout")
+    sub.add_parser("search", parents=[db], help="search nodes").add_argument("query")
+    p_bench = sub.add_parser("bench", help="query latency vs. observation count")
+    p_bench.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    args = parser.parse_args(argv)
+
+    if args.command == "bench":
+        for row in bench(args.sizes):
+            print(json.dumps(row))
+        return 0
+
+    store = MemoryStore(args.db)
+    try:
+        if args.command == "serve":
+            serve(store)
+        elif args.command == "import":
+            with open(args.source, encoding="utf-8") as fh:
+                print(json.dumps(import_jsonl(store, fh)))
+        elif args.command == "export":
+            export_jsonl(store, sys.stdout)
+        else:
+            print(json.dumps(store.search_nodes(args.query), indent=2))
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""Locating machine templates in the registry checkout."""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+MACHINES_DIR = REPO_ROOT / "machines"
+DEFAULT_TEMPLATE = "anything-machine"
+
+# Never copied into a workspace.
+IGNORED_NAMES = frozenset({".git", "__pycache__", ".DS_Store"})
+
+
+def template_names(machines_dir: Path = MACHINES_DIR) -> list[str]:
+    """Return the sorted names of all template directories."""
+    if not machines_dir.is_dir():
+        return []
+    return sorted(
+        entry.name
+        for entry in os.scandir(machines_dir)
+        if entry.is_dir() and entry.name not in IGNORED_NAMES
+    )
+
+
+def template_dir(name: str, machines_dir: Path = MACHINES_DIR) -> Path:
+    """Return the directory for template ``name``, raising if it is unknown."""
+    path = machines_dir / name
+    if not path.is_dir():
+        raise KeyError(f"unknown machine template: {name}")
+    return path
+
+
+def iter_template_files(root: Path):
+    """Yield ``(relative_posix_path, os.DirEntry)`` for every file under ``root``.
+
+    Hidden files are included (``.mcp.json``, ``.claude/``); entries named in
+    ``IGNORED_NAMES`` and symlinks are skipped. Output is sorted so manifests
+    are stable across filesystems.
+    """
+    stack = [("", str(root))]
+    while stack:
+        prefix, path = stack.pop()
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        subdirs = []
+        for entry in entries:
+            if entry.name in IGNORED_NAMES or entry.is_symlink():
+                continue
+            rel = f"{prefix}{entry.name}"
+            if entry.is_dir():
+                subdirs.append((rel + "/", entry.path))
+            elif entry.is_file():
+                yield rel, entry
+        stack.extend(reversed(subdirs))
@@ -0,0 +1,269 @@
+"""Lazy loading and reproducible packing of ``.skill`` archives.
+
+A ``.skill`` file is a zip archive holding ``<name>/SKILL.md`` (with
+``name``/``description`` frontmatter) plus any supporting files.
+
+Discovery reads only each archive's central directory and the leading bytes
+of ``SKILL.md`` up to the end of its frontmatter; nothing is extracted. The
+resulting catalog is cached by archive SHA-256 (with a stat signature in
+front so unchanged archives are not re-hashed). A skill's body and files are
+read only when it is invoked.
+
+Packing is deterministic: entries are sorted, timestamps and permissions
+are fixed, and the archive comment records a digest of the sources so an
+archive is rebuilt only when they change.
+
+Usage::
+
+    python -m tools.skills list
+    python -m tools.skills pack
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import zipfile
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from tools.layers import split_frontmatter
+from tools.materialize import hash_file
+from tools.registry import IGNORED_NAMES, REPO_ROOT, iter_template_files
+from tools.timing import timed
+
+SKILL_FILE = "SKILL.md"
+SOURCES_DIR = REPO_ROOT / "skills"
+DEFAULT_CACHE = REPO_ROOT / ".cache" / "skills.json"
+
+# 1980-01-01 is the earliest timestamp a zip entry can hold.
+_EPOCH = (1980, 1, 1, 0, 0, 0)
+_COMMENT_PREFIX = b"sources-sha256:"
+_FRONTMATTER_LIMIT = 64 * 1024
+_CATALOG_VERSION = 1
+
+
+class SkillError(Exception):
+    """Raised for an archive without a readable ``SKILL.md``."""
+
+
+@dataclass(frozen=True)
+class Skill:
+    name: str
+    description: str
+    archive: str
+    entry: str
+    sha256: str
+
+    @property
+    def root(self) -> str:
+        return self.entry.rpartition("/")[0]
+
+    def body(self) -> str:
+        """Return ``SKILL.md`` without its frontmatter."""
+        with zipfile.ZipFile(self.archive) as zf:
+            text = zf.read(self.entry).decode("utf-8")
+        return split_frontmatter(text)[1]
+
+    def extract(self, dest: str | os.PathLike) -> Path:
+        """Extract this skill's files under ``dest`` and return the skill dir."""
+        prefix = f"{self.root}/" if self.root else ""
+        with zipfile.ZipFile(self.archive) as zf:
+            members = [n for n in zf.namelist() if n.startswith(prefix)]
+            zf.extractall(dest, members)
+        return Path(dest) / self.root
+
+
+def _read_frontmatter(zf: zipfile.ZipFile, entry: str) -> dict[str, str]:
+    buf = b""
+    with zf.open(entry) as fh:
+        while len(buf) < _FRONTMATTER_LIMIT:
+            chunk = fh.read(1024)
+            if not chunk:
+                break
+            buf += chunk
+            # Stop at the closing delimiter, or at once if there is none.
+            if not buf.startswith(b"---") or buf.find(b"\n---", 3) >= 0:
+                break
+    meta, _ = split_frontmatter(buf.decode("utf-8", "replace"))
+    return meta
+
+
+@timed("skills.scan")
+def scan_archive(path: str | os.PathLike, sha256: str | None = None) -> list[Skill]:
+    """Return the skills in one archive, reading only their frontmatter."""
+    path = os.fspath(path)
+    sha256 = sha256 or hash_file(path)
+    skills = []
+    try:
+        with zipfile.ZipFile(path) as zf:
+            for entry in sorted(zf.namelist()):
+                if entry.rpartition("/")[2] != SKILL_FILE or entry.count("/") > 1:
+                    continue
+                meta = _read_frontmatter(zf, entry)
+                name = meta.get("name") or entry.rpartition("/")[0] or Path(path).stem
+                skills.append(Skill(name, meta.get("description", ""), path, entry, sha256))
+    except zipfile.BadZipFile as exc:
+        raise SkillError(f"{path}: {exc}") from exc
+    if not skills:
+        raise SkillError(f"{path}: no {SKILL_FILE} found")
+    return skills
+
+
+class Catalog:
+    """Skill catalog over a set of archives, persisted between runs."""
+
+    def __init__(self, cache_path: Path | None = DEFAULT_CACHE):
+        self.cache_path = Path(cache_path) if cache_path is not None else None
+        self._archives: dict[str, dict] = {}
+        if self.cache_path is not None:
+            try:
+                data = json.loads(self.cache_path.read_text())
+                if data.get("version") == _CATALOG_VERSION:
+                    self._archives = data["archives"]
+            except (OSError, ValueError, KeyError):
+                pass
+        self._dirty = False
+
+    @timed("skills.load")
+    def load(self, archives) -> dict[str, Skill]:
+        """Return ``{name: Skill}`` for ``archives``, scanning only changed ones."""
+        skills: dict[str, Skill] = {}
+        by_hash = {a["sha256"]: a["skills"] for a in self._archives.values()}
+        for archive in archives:
+            path = os.fspath(archive)
+            st = os.stat(path)
+            signature = [st.st_size, st.st_mtime_ns]
+            cached = self._archives.get(path)
+            if cached and cached["signature"] == signature:
+                found = [Skill(**s) for s in cached["skills"]]
+            else:
+                sha = hash_file(path)
+                if sha in by_hash:
+                    found = [Skill(**{**s, "archive": path}) for s in by_hash[sha]]
+                else:
+                    found = scan_archive(path, sha)
+                self._archives[path] = {
+                    "signature": signature,
+                    "sha256": sha,
+                    "skills": [asdict(s) for s in found],
+                }
+                self._dirty = True
+            for skill in found:
+                skills[skill.name] = skill
+        return skills
+
+    def save(self) -> None:
+        if self.cache_path is None or not self._dirty:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.cache_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": _CATALOG_VERSION, "archives": self._archives}))
+        os.replace(tmp, self.cache_path)
+        self._dirty = False
+
+
+def find_archives(root: Path = REPO_ROOT) -> list[Path]:
+    return sorted(p for p in root.glob("*.skill") if p.is_file())
+
+
+def sources_digest(source: Path) -> str:
+    h = hashlib.sha256()
+    for rel, entry in iter_template_files(source):
+        h.update(f"{rel}\0{hash_file(entry.path)}\n".encode())
+    return h.hexdigest()
+
+
+def pack(source: str | os.PathLike, archive: str | os.PathLike, force: bool = False) -> bool:
+    """Pack skill directory ``source`` into ``archive``.
+
+    Entries are stored as ``<dirname>/<path>``. Returns ``False`` without
+    writing when the archive already holds the same sources.
+    """
+    source, archive = Path(source), Path(archive)
+    if not (source / SKILL_FILE).is_file():
+        raise SkillError(f"{source}: missing {SKILL_FILE}")
+    digest = sources_digest(source)
+    comment = _COMMENT_PREFIX + digest.encode()
+    if not force and archive.exists():
+        try:
+            with zipfile.ZipFile(archive) as zf:
+                if zf.comment == comment:
+                    return False
+        except zipfile.BadZipFile:
+            pass
+
+    tmp = archive.with_name(archive.name + ".tmp")
+    with zipfile.ZipFile(tmp, "w") as zf:
+        for rel, entry in sorted(iter_template_files(source)):
+            info = zipfile.ZipInfo(f"{source.name}/{rel}", date_time=_EPOCH)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.create_system = 3  # unix, so external_attr is honoured
+            info.external_attr = 0o100644 << 16
+            with open(entry.path, "rb") as fh:
+                zf.writestr(info, fh.read(), compresslevel=9)
+        zf.comment = comment
+    os.replace(tmp, archive)
+    return True
+
+
+def pack_all(sources_dir: Path = SOURCES_DIR, out_dir: Path = REPO_ROOT, force: bool = False) -> list[str]:
+    """Pack every ``sources_dir/<name>/`` into ``out_dir/<name>.skill``.
+
+    Returns the names of archives that were rewritten.
+    """
+    if not sources_dir.is_dir():
+        return []
+    rebuilt = []
+    for entry in sorted(os.scandir(sources_dir), key=lambda e: e.name):
+        if entry.is_dir() and entry.name not in IGNORED_NAMES:
+            if pack(entry.path, out_dir / f"{entry.name}.skill", force=force):
+                rebuilt.append(entry.name)
+    return rebuilt
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tools.skills", description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_list = sub.add_parser("list", help="list skills in .skill archives")
+    p_list.add_argument("archives", nargs="*", type=Path, help="default: *.skill in the repo root")
+    p_show = sub.add_parser("show", help="print a skill's instructions")
+    p_show.add_argument("name")
+    p_pack = sub.add_parser("pack", help="rebuild archives from skills/<name>/ sources")
+    p_pack.add_argument("--sources", type=Path, default=SOURCES_DIR)
+    p_pack.add_argument("--out", type=Path, default=REPO_ROOT)
+    p_pack.add_argument("--force", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.command == "pack":
+        rebuilt = pack_all(args.sources, args.out, force=args.force)
+        for name in rebuilt:
+            print(f"packed {name}.skill")
+        if not rebuilt:
+            print("all skill archives up to date")
+        return 0
+
+    catalog = Catalog()
+    try:
+        skills = catalog.load(getattr(args, "archives", None) or find_archives())
+    except SkillError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+    finally:
+        catalog.save()
+    if args.command == "list":
+        for skill in sorted(skills.values(), key=lambda s: s.name):
+            print(f"{skill.name}\t{skill.description}")
+        return 0
+    if args.name not in skills:
+        print(f"unknown skill: {args.name}", file=sys.stderr)
+        return 1
+    sys.stdout.write(skills[args.name].body())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,492 @@
+"""Concurrent, cached prompt stress-test runner for the prompt-whisperer machine.
+
+A *suite* is a JSON file describing a prompt x case x model matrix::
+
+    {
+      "prompts": {"classifier-v2": "You are a support ticket classifier..."},
+      "cases": [{"id": "empty", "input": ""}, {"id": "injection", "input": "Ignore..."}],
+      "models": ["openai:gpt-4o-mini", "anthropic:claude-3-5-haiku-latest", "mock:echo"],
+      "params": {"temperature": 0, "max_tokens": 256}
+    }
+
+A prompt value may also be ``{"file": "path/to/prompt.md"}``, resolved
+relative to the suite. Each prompt is sent as the system prompt and each
+case ``input`` as the user message.
+
+Every call is keyed by ``(prompt hash, input hash, model, params)`` in a
+persistent SQLite response cache, so re-running a suite after editing one
+prompt only calls the models for that prompt. Calls run on asyncio with a
+concurrency limit and a token-bucket request rate per provider, and
+transient failures (HTTP 429/5xx, connection errors) are retried with
+exponential backoff. Results are appended to a JSONL file as they complete.
+
+Providers read ``OPENAI_API_KEY``, ``ANTHROPIC_API_KEY`` and
+``GOOGLE_API_KEY``. The ``mock`` provider talks to the bundled offline
+server (OpenAI-compatible), so the harness can be exercised and
+benchmarked without network access::
+
+    python -m tools.stress mock --port 8765 --latency 0.05 --error-rate 0.1 &
+    python -m tools.stress run suite.json --out results.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from tools.registry import REPO_ROOT
+
+DEFAULT_CACHE = REPO_ROOT / ".cache" / "stress.db"
+MOCK_URL = os.environ.get("STRESS_MOCK_URL", "http://127.0.0.1:8765")
+
+
+class StressError(Exception):
+    """Raised for an invalid suite or a non-retryable provider error."""
+
+
+class RetryableError(StressError):
+    """A failure worth retrying (rate limit, server error, network)."""
+
+
+# -- providers ---------------------------------------------------------
+
+@dataclass
+class Provider:
+    name: str
+    concurrency: int = 8
+    rate: float = 10.0  # requests per second
+    burst: int = 10
+
+    def request(self, model: str, system: str, user: str, params: dict) -> urllib.request.Request:
+        raise NotImplementedError
+
+    def parse(self, body: dict) -> tuple[str, dict]:
+        """Return ``(text, usage)`` from a response body."""
+        raise NotImplementedError
+
+
+def _post(url: str, payload: dict, headers: dict) -> urllib.request.Request:
+    return urllib.request.Request(
+        url, data=json.dumps(payload).encode(), method="POST",
+        headers={"content-type": "application/json", **headers},
+    )
+
+
+def _key(env: str) -> str:
+    value = os.environ.get(env)
+    if not value:
+        raise StressError(f"{env} is not set")
+    return value
+
+
+class OpenAIProvider(Provider):
+    base_url = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")
+    key_env: str | None = "OPENAI_API_KEY"
+
+    def request(self, model, system, user, params):
+        headers = {"authorization": f"Bearer {_key(self.key_env)}"} if self.key_env else {}
+        messages = [{"role": "system", "content": system}, {"role": "user", "content": user}]
+        return _post(f"{self.base_url}/chat/completions", {"model": model, "messages": messages, **params}, headers)
+
+    def parse(self, body):
+        return body["choices"][0]["message"]["content"] or "", body.get("usage") or {}
+
+
+class MockProvider(OpenAIProvider):
+    base_url = f"{MOCK_URL}/v1"
+    key_env = None
+
+
+class AnthropicProvider(Provider):
+    base_url = os.environ.get("ANTHROPIC_BASE_URL", "https://api.anthropic.com/v1")
+
+    def request(self, model, system, user, params):
+        payload = {"model": model, "system": system, "messages": [{"role": "user", "content": user}],
+                   "max_tokens": 1024, **params}
+        headers = {"x-api-key": _key("ANTHROPIC_API_KEY"), "anthropic-version": "2023-06-01"}
+        return _post(f"{self.base_url}/messages", payload, headers)
+
+    def parse(self, body):
+        text = "".join(block.get("text", "") for block in body.get("content", []))
+        return text, body.get("usage") or {}
+
+
+class GoogleProvider(Provider):
+    base_url = os.environ.get("GOOGLE_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+
+    def request(self, model, system, user, params):
+        config = {"temperature": params.get("temperature"), "maxOutputTokens": params.get("max_tokens")}
+        payload = {
+            "systemInstruction": {"parts": [{"text": system}]},
+            "contents": [{"role": "user", "parts": [{"text": user}]}],
+            "generationConfig": {k: v for k, v in config.items() if v is not None},
+        }
+        url = f"{self.base_url}/models/{model}:generateContent"
+        return _post(url, payload, {"x-goog-api-key": _key("GOOGLE_API_KEY")})
+
+    def parse(self, body):
+        parts = body["candidates"][0]["content"]["parts"]
+        return "".join(p.get("text", "") for p in parts), body.get("usageMetadata") or {}
+
+
+# The local mock should never be the bottleneck when benchmarking the harness.
+DEFAULT_LIMITS = {"mock": {"concurrency": 64, "rate": 1000.0, "burst": 100}}
+
+PROVIDERS: dict[str, type[Provider]] = {
+    "openai": OpenAIProvider,
+    "anthropic": AnthropicProvider,
+    "google": GoogleProvider,
+    "mock": MockProvider,
+}
+
+
+def _call_sync(provider: Provider, model: str, system: str, user: str, params: dict,
+               timeout: float) -> tuple[str, dict, float]:
+    """Make one blocking call. Returns ``(text, usage, latency_ms)``."""
+    req = provider.request(model, system, user, params)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            body = json.load(resp)
+    except ValueError as exc:
+        raise StressError(f"invalid JSON response: {exc}") from None
+    except urllib.error.HTTPError as exc:
+        detail = exc.read()[:300].decode("utf-8", "replace")
+        if exc.code == 429 or exc.code >= 500:
+            raise RetryableError(f"HTTP {exc.code}: {detail}") from None
+        raise StressError(f"HTTP {exc.code}: {detail}") from None
+    except (urllib.error.URLError, TimeoutError, ConnectionError) as exc:
+        raise RetryableError(str(exc)) from None
+    latency_ms = (time.perf_counter() - start) * 1000
+    try:
+        text, usage = provider.parse(body)
+    except (KeyError, IndexError, TypeError, AttributeError) as exc:
+        raise StressError(f"unexpected response shape ({type(exc).__name__}: {exc}): {json.dumps(body)[:300]}") from None
+    return text, usage, latency_ms
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` tokens per second, up to ``burst``."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def take(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# -- cache -------------------------------------------------------------
+
+def _sha(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def cache_key(prompt: str, user: str, model: str, params: dict) -> str:
+    return _sha("\0".join([_sha(prompt), _sha(user), model, json.dumps(params, sort_keys=True)]))
+
+
+class ResponseCache:
+    def __init__(self, path: Path | str = DEFAULT_CACHE):
+        if str(path) != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path), isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, model TEXT, output TEXT, "
+            "usage TEXT, latency_ms REAL, created REAL)"
+        )
+
+    def get(self, key: str) -> dict | None:
+        row = self.db.execute("SELECT output, usage, latency_ms FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return {"output": row[0], "usage": json.loads(row[1]), "latency_ms": row[2]}
+
+    def put(self, key: str, model: str, output: str, usage: dict, latency_ms: float) -> None:
+        self.db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, output, json.dumps(usage), latency_ms, time.time()),
+        )
+
+    def close(self) -> None:
+        self.db.close()
+
+
+# -- runner ------------------------------------------------------------
+
+@dataclass
+class Suite:
+    prompts: dict[str, str]
+    cases: list[dict]
+    models: list[str]
+    params: dict = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path) -> "Suite":
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            raise StressError(f"cannot read suite {path}: {exc}") from exc
+        if not isinstance(data, dict):
+            raise StressError(f"{path}: suite must be a JSON object")
+        prompts = {}
+        for name, value in (data.get("prompts") or {}).items():
+            if isinstance(value, dict) and "file" in value:
+                try:
+                    value = (Path(path).parent / value["file"]).read_text(encoding="utf-8")
+                except OSError as exc:
+                    raise StressError(f"{path}: prompt {name!r}: {exc}") from exc
+            if not isinstance(value, str):
+                raise StressError(f"{path}: prompt {name!r} must be a string or {{\"file\": ...}}")
+            prompts[name] = value
+        cases = [c if isinstance(c, dict) else {"id": str(i), "input": c} for i, c in enumerate(data.get("cases", []))]
+        for i, case in enumerate(cases):
+            case.setdefault("id", str(i))
+            if not isinstance(case.get("input"), str):
+                raise StressError(f"{path}: case {case['id']!r} needs a string \"input\"")
+        suite = cls(prompts, cases, list(data.get("models", [])), dict(data.get("params") or {}))
+        if not (suite.prompts and suite.cases and suite.models):
+            raise StressError(f"{path}: suite needs prompts, cases and models")
+        for model in suite.models:
+            if model.partition(":")[0] not in PROVIDERS:
+                raise StressError(f"{path}: unknown provider in {model!r} (expected one of {', '.join(PROVIDERS)})")
+        return suite
+
+
+@dataclass
+class Summary:
+    total: int = 0
+    cached: int = 0
+    called: int = 0
+    failed: int = 0
+    retries: int = 0
+    latencies: list[float] = field(default_factory=list)
+    wall_s: float = 0.0
+
+    def to_json(self) -> dict:
+        lat = sorted(self.latencies)
+        return {
+            "total": self.total,
+            "cached": self.cached,
+            "called": self.called,
+            "failed": self.failed,
+            "retries": self.retries,
+            "latency_ms_p50": round(lat[len(lat) // 2], 1) if lat else None,
+            "latency_ms_p95": round(lat[min(len(lat) - 1, int(len(lat) * 0.95))], 1) if lat else None,
+            "wall_s": round(self.wall_s, 3),
+        }
+
+
+class Runner:
+    def __init__(self, cache: ResponseCache, max_retries: int = 4, timeout: float = 60.0,
+                 limits: dict[str, dict] | None = None):
+        self.cache = cache
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.providers: dict[str, Provider] = {}
+        # Overrides refine the defaults, so ``mock=8`` keeps the mock's rate.
+        self._limits = {name: dict(limit) for name, limit in DEFAULT_LIMITS.items()}
+        for name, limit in (limits or {}).items():
+            self._limits.setdefault(name, {}).update(limit)
+
+    def _provider(self, name: str) -> Provider:
+        provider = self.providers.get(name)
+        if provider is None:
+            provider = PROVIDERS[name](name, **self._limits.get(name, {}))
+            provider.semaphore = asyncio.Semaphore(provider.concurrency)
+            provider.bucket = TokenBucket(provider.rate, provider.burst)
+            self.providers[name] = provider
+        return provider
+
+    async def _one(self, prompt_name: str, prompt: str, case: dict, model_spec: str,
+                   params: dict, summary: Summary) -> dict:
+        provider_name, _, model = model_spec.partition(":")
+        key = cache_key(prompt, case["input"], model_spec, params)
+        record = {"prompt": prompt_name, "case": case["id"], "model": model_spec, "key": key[:16]}
+        cached = self.cache.get(key)
+        if cached is not None:
+            summary.cached += 1
+            return {**record, **cached, "cached": True, "error": None}
+
+        provider = self._provider(provider_name)
+        attempt = 0
+        async with provider.semaphore:
+            while True:
+                await provider.bucket.take()
+                try:
+                    output, usage, latency_ms = await asyncio.get_running_loop().run_in_executor(
+                        self._executor, _call_sync, provider, model, prompt, case["input"], params, self.timeout
+                    )
+                except RetryableError as exc:
+                    if attempt >= self.max_retries:
+                        summary.failed += 1
+                        return {**record, "cached": False, "error": str(exc)}
+                    attempt += 1
+                    summary.retries += 1
+                    await asyncio.sleep(min(30.0, 0.5 * 2 ** attempt) * (0.5 + random.random()))
+                    continue
+                except StressError as exc:
+                    summary.failed += 1
+                    return {**record, "cached": False, "error": str(exc)}
+                except Exception as exc:  # one bad cell must not abort the matrix
+                    summary.failed += 1
+                    return {**record, "cached": False, "error": f"{type(exc).__name__}: {exc}"}
+                break
+        summary.called += 1
+        summary.latencies.append(latency_ms)
+        self.cache.put(key, model_spec, output, usage, latency_ms)
+        return {**record, "output": output, "usage": usage, "latency_ms": round(latency_ms, 1),
+                "cached": False, "error": None}
+
+    async def run(self, suite: Suite, out) -> Summary:
+        """Run every prompt x case x model cell, writing each result to ``out`` on completion."""
+        summary = Summary()
+        start = time.perf_counter()
+        # One thread per concurrency slot, so the executor never queues calls
+        # that a provider semaphore has already admitted.
+        providers = {model.partition(":")[0] for model in suite.models}
+        slots = sum(self._provider(name).concurrency for name in providers)
+        self._executor = ThreadPoolExecutor(max_workers=slots)
+        tasks = [
+            asyncio.create_task(self._one(pname, ptext, case, model, suite.params, summary))
+            for pname, ptext in suite.prompts.items()
+            for case in suite.cases
+            for model in suite.models
+        ]
+        summary.total = len(tasks)
+        try:
+            for finished in asyncio.as_completed(tasks):
+                out.write(json.dumps(await finished) + "\n")
+                out.flush()
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        summary.wall_s = time.perf_counter() - start
+        return summary
+
+
+# -- mock server -------------------------------------------------------
+
+def mock_server(port: int = 8765, latency: float = 0.05, error_rate: float = 0.0,
+                host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Build an OpenAI-compatible mock that echoes the request deterministically.
+
+    ``latency`` seconds are added to every response (with +/-50% jitter) and
+    ``error_rate`` of requests fail with HTTP 429 or 503 to exercise retries.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):  # noqa: N802 (http.server API)
+            body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+            time.sleep(latency * (0.5 + random.random()))
+            if random.random() < error_rate:
+                self.send_response(random.choice([429, 503]))
+                self.end_headers()
+                self.wfile.write(b'{"error": "mock failure"}')
+                return
+            messages = body.get("messages", [])
+            user = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+            system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+            text = f"[{body.get('model', 'mock')}] {_sha(system)[:8]} {user[::-1]}"
+            reply = {
+                "id": "mock", "object": "chat.completion", "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": (len(system) + len(user)) // 4, "completion_tokens": len(text) // 4},
+            }
+            data = json.dumps(reply).encode()
+            self.send_response(200)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m tools.stress", description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_run = sub.add_parser("run", help="run a suite")
+    p_run.add_argument("suite", type=Path)
+    p_run.add_argument("--out", type=Path, default=Path("results.jsonl"))
+    p_run.add_argument("--cache", type=Path, default=DEFAULT_CACHE)
+    p_run.add_argument("--retries", type=int, default=4)
+    p_run.add_argument("--limit", action="append", default=[], metavar="PROVIDER=CONCURRENCY[:RPS]",
+                       help="per-provider limits, e.g. openai=4:2")
+    p_run.add_argument("--with-mock", action="store_true", help="start the mock server in-process")
+    p_mock = sub.add_parser("mock", help="serve the offline mock model")
+    p_mock.add_argument("--port", type=int, default=8765)
+    p_mock.add_argument("--latency", type=float, default=0.05)
+    p_mock.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    if args.command == "mock":
+        server = mock_server(args.port, args.latency, args.error_rate)
+        print(f"mock model listening on http://127.0.0.1:{args.port}/v1", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    limits = {}
+    for item in args.limit:
+        name, _, spec = item.partition("=")
+        concurrency, _, rps = spec.partition(":")
+        limits[name] = {"concurrency": int(concurrency), **({"rate": float(rps), "burst": max(1, int(float(rps)))} if rps else {})}
+
+    try:
+        suite = Suite.load(args.suite)
+    except StressError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+
+    server = None
+    if args.with_mock:
+        port = int(MOCK_URL.rsplit(":", 1)[1])
+        server = mock_server(port)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    cache = ResponseCache(args.cache)
+    try:
+        with open(args.out, "a", encoding="utf-8") as out:
+            summary = asyncio.run(Runner(cache, args.retries, limits=limits).run(suite, out))
+    finally:
+        cache.close()
+        if server is not None:
+            server.shutdown()
+    print(json.dumps(summary.to_json()))
+    return 1 if summary.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""Optional timing spans for the provisioning hot paths.
+
+Code wraps interesting steps in :func:`span` or decorates them with
+:func:`timed`; when no hook is registered a span costs one list check, so
+instrumentation can stay in production code paths. Register a hook to see
+where time goes::
+
+    from tools import timing
+
+    timing.add_hook(lambda name, ms, attrs: statsd.timing(name, ms))
+
+or set ``LOVING_GRACE_TRACE=/path/spans.jsonl`` to append every span as a
+JSON line. :class:`Recorder` collects spans in memory (used by
+:mod:`tools.bench`).
+"""
+
+from __future__ import annotations
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_hooks: list = []
+
+
+def add_hook(hook) -> None:
+    """Call ``hook(name, duration_ms, attrs)`` for every finished span."""
+    _hooks.append(hook)
+
+
+def remove_hook(hook) -> None:
+    try:
+        _hooks.remove(hook)
+    except ValueError:
+        pass
+
+
+@contextmanager
+def span(name: str, **attrs):
+    if not _hooks:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - start) * 1000
+        for hook in list(_hooks):
+            hook(name, ms, attrs)
+
+
+def timed(name: str):
+    """Decorator form of :func:`span`."""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _hooks:
+                return fn(*args, **kwargs)
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+class Recorder:
+    """Hook that accumulates span durations per name; usable as a context manager."""
+
+    def __init__(self):
+        self.spans: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, name: str, ms: float, attrs: dict) -> None:
+        with self._lock:
+            self.spans.setdefault(name, []).append(ms)
+
+    def __enter__(self) -> "Recorder":
+        add_hook(self)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        remove_hook(self)
+
+    def summary(self) -> dict[str, dict]:
+        out = {}
+        for name, values in sorted(self.spans.items()):
+            values = sorted(values)
+            out[name] = {
+                "count": len(values),
+                "total_ms": round(sum(values), 3),
+                "p50_ms": round(values[len(values) // 2], 3),
+            }
+        return out
+
+
+def _jsonl_hook(path: str):
+    fh = open(path, "a", encoding="utf-8")
+    lock = threading.Lock()
+    atexit.register(fh.close)
+
+    def hook(name, ms, attrs):
+        line = json.dumps({"span": name, "ms": round(ms, 3), "ts": time.time(), **attrs}, default=str)
+        with lock:
+            fh.write(line + "\n")
+
+    return hook
+
+
+if os.environ.get("LOVING_GRACE_TRACE"):
+    add_hook(_jsonl_hook(os.environ["LOVING_GRACE_TRACE"]))